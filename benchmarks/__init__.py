@@ -0,0 +1,11 @@
+"""
+Benchmark suite for the merge engine.
+
+Generates synthetic settings trees and measures the main entrypoints
+(Merger, KeyDiffer and MarkupParser) against a baseline that mimics the
+current dynaconf `object_merge`.
+
+Usage:
+    $ python -m benchmarks --width 10 --depth 4 --output bench.json
+    $ python -m benchmarks --compare bench.json  # compare against previous run
+"""
@@ -0,0 +1,45 @@
+"""
+Baseline merge, mimicking dynaconf's current `dynaconf.utils.object_merge`.
+
+It is a standalone copy (no dynaconf import) of the parts that matter for
+performance: the `old == new` short-circuit at every level, the list prepend
+loop and the dict key walk. Case-insensitive key lookups and lazy-value
+handling are left out, as they depend on dynaconf internals.
+
+Note that, as in dynaconf, `new` is the mutated object and the returned one.
+"""
+from __future__ import annotations
+
+
+def object_merge(old, new, unique: bool = False):
+    """Recursively merge @old into @new, returning @new."""
+    if old == new or old is None or new is None:
+        return new
+
+    if isinstance(old, list) and isinstance(new, list):
+        if "dynaconf_merge_unique" in new:
+            new.remove("dynaconf_merge_unique")
+            unique = True
+        if "dynaconf_merge" in new:
+            new.remove("dynaconf_merge")
+
+        for item in old[::-1]:
+            if unique and item in new:
+                continue
+            new.insert(0, item)
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for old_key, value in old.items():
+            if old_key not in new:
+                new[old_key] = value
+            else:
+                object_merge(value, new[old_key])
+        _handle_metavalues(new)
+
+    return new
+
+
+def _handle_metavalues(new: dict):
+    """Drop the merge marks left in @new (`dynaconf.utils.handle_metavalues`)."""
+    new.pop("dynaconf_merge", None)
+    new.pop("dynaconf_merge_unique", None)
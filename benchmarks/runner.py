@@ -0,0 +1,444 @@
+"""
+Benchmark registry, measurement and reporting.
+
+Each benchmark is registered with a `prepare` function, which receives fresh
+copies of the generated (old, new) trees and returns the callable to be timed
+and the number of nodes it processes. Preparing is never timed, and it is done
+for every repetition, since merging mutates its inputs.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable
+
+from benchmarks.baseline import object_merge
+from benchmarks.trees import (
+    TreeSpec,
+    count_nodes,
+    generate_layers,
+    generate_pair,
+    generate_records,
+    generate_strings,
+    iter_container_pairs,
+)
+from dynamerge.differ import KeyDiff, KeyDiffer, PseudoIdStrategies
+from dynamerge.fingerprint import Fingerprinter
+from dynamerge.main import BaseTree
+from dynamerge.marks import MarkupParser, ScopeParser
+from dynamerge.merge_policy import MergePolicy, MergePolicyNode
+from dynamerge.merger import LazyPath, Merger
+
+Prepared = tuple[Callable[[], Any], int]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    prepare: Callable[[dict, dict, TreeSpec], Prepared]
+    description: str = ""
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def register(name: str, description: str = ""):
+    """Register a prepare function as the benchmark @name."""
+
+    def decorator(prepare):
+        BENCHMARKS[name] = Benchmark(name, prepare, description)
+        return prepare
+
+    return decorator
+
+
+@register("merger.merge", "Merger.merge over the full tree")
+def _merger_merge(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    return partial(Merger.merge, old, new), count_nodes(old) + count_nodes(new)
+
+
+@register("merger.merge[no-patch]", "Merger.merge without recording the TreePatch")
+def _merger_merge_no_patch(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    nodes = count_nodes(old) + count_nodes(new)
+    return partial(Merger.merge, old, new, record_patch=False), nodes
+
+
+@register("merger.merge[skip]", "Merger.merge skipping identical subtrees")
+def _merger_merge_skip_identical(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    nodes = count_nodes(old) + count_nodes(new)
+    return partial(Merger.merge, old, new, skip_identical=True), nodes
+
+
+@register("merger.merge[iterative]", "Merger.merge with the iterative engine")
+def _merger_merge_iterative(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    nodes = count_nodes(old) + count_nodes(new)
+    return partial(Merger.merge, old, new, engine="iterative"), nodes
+
+
+@register("merger.merge[preparse]", "Merger.merge with single-pass mark parsing")
+def _merger_merge_preparse(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    nodes = count_nodes(old) + count_nodes(new)
+    return partial(Merger.merge, old, new, preparse=True), nodes
+
+
+@register("merger.merge[persistent]", "Merger.merge without mutating old")
+def _merger_merge_persistent(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    nodes = count_nodes(old) + count_nodes(new)
+    return partial(Merger.merge, old, new, persistent=True), nodes
+
+
+@register("merger.merge_many", "Merger.merge_many of 4 layers derived from old")
+def _merger_merge_many(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    base, layers = generate_layers(spec, 4)
+    nodes = count_nodes(base) + sum(count_nodes(layer) for layer in layers)
+    return partial(Merger.merge_many, base, layers), nodes
+
+
+@register("merger.merge[sequential]", "Merger.merge of the same 4 layers, in order")
+def _merger_merge_sequential(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    base, layers = generate_layers(spec, 4)
+    nodes = count_nodes(base) + sum(count_nodes(layer) for layer in layers)
+    return partial(_merge_all, base, layers), nodes
+
+
+@register(
+    "merger.merge[unique-list]",
+    "Merger.merge of two 10k string lists (half shared) with merge_unique",
+)
+def _merger_merge_unique_list(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    strings = generate_strings(TreeSpec(seed=spec.seed), 15_000)
+    old = {"root": {"hosts": strings[:10_000]}}
+    new = {"root": {"hosts": strings[5_000:] + ["dynaconf_merge_unique"]}}
+    return partial(Merger.merge, old, new), 20_000
+
+
+@register(
+    "merger.merge[keyed-records]",
+    "Merger.merge of two lists of 2k records (half shared) keyed by name",
+)
+def _merger_merge_keyed_records(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    records_spec = TreeSpec(list_length=2_000, seed=spec.seed)
+    old_records = generate_records(records_spec, offset=0)
+    new_records = generate_records(records_spec, offset=1_000)
+    old = {"root": {"services": old_records}}
+    new = {
+        "root": {
+            "services": new_records + ["dynaconf_id_key=name", "dynaconf_merge"]
+        }
+    }
+    return partial(Merger.merge, old, new), count_nodes(old) + count_nodes(new)
+
+
+@register("merger.merge_containers", "Merger.merge_containers with a default policy")
+def _merger_merge_containers(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    nodes = count_nodes(old) + count_nodes(new)
+    return partial(Merger.merge_containers, old, new, MergePolicy()), nodes
+
+
+@register("differ.diff_dict", "KeyDiffer.diff_dict for every dict pair of the tree")
+def _differ_diff_dict(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    pairs = list(iter_container_pairs(old, new, dict))
+    nodes = sum(len(o) + len(n) for o, n in pairs)
+    return partial(_diff_all, KeyDiffer.diff_dict, pairs), nodes
+
+
+@register("differ.diff_list", "KeyDiffer.diff_list for every list pair of the tree")
+def _differ_diff_list(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    pairs = list(iter_container_pairs(old, new, list))
+    nodes = sum(len(o) + len(n) for o, n in pairs)
+    return partial(_diff_all, KeyDiffer.diff_list, pairs), nodes
+
+
+@register(
+    "differ.diff_list[content]",
+    "KeyDiffer.diff_list by content hash, over lists of list-length records",
+)
+def _differ_diff_list_content(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    old_records = generate_records(spec, offset=0)
+    new_records = generate_records(spec, offset=spec.list_length // 2)
+    diff = partial(
+        KeyDiffer.diff_list,
+        old_records,
+        new_records,
+        pseudo_id_strategy=PseudoIdStrategies.use_content_hash,
+        fingerprinter=Fingerprinter(),
+    )
+    return diff, len(old_records) + len(new_records)
+
+
+@register("marks.parse_tree", "MarkupParser.parse_tree over the new tree")
+def _marks_parse_tree(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    return MarkupParser(new).parse_tree, count_nodes(new)
+
+
+@register(
+    "marks.parse_from_list",
+    "ScopeParser.parse_from_list over 100k strings (mark-density of them marks)",
+)
+def _marks_parse_from_list(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    strings = generate_strings(spec, 100_000)
+    return partial(ScopeParser.parse_from_list, strings), len(strings)
+
+
+@register("baseline.object_merge", "dynaconf object_merge mimic (baseline)")
+def _baseline_object_merge(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    return partial(object_merge, old, new), count_nodes(old) + count_nodes(new)
+
+
+@register("base_tree.get", "BaseTree.get of every dotted key, walking the tree")
+def _base_tree_get(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    return _prepare_reads(BaseTree(), old)
+
+
+@register("base_tree.get[index]", "BaseTree.get of every dotted key, path index")
+def _base_tree_get_index(old: dict, new: dict, spec: TreeSpec) -> Prepared:
+    return _prepare_reads(BaseTree(path_index=True), old)
+
+
+def _prepare_reads(tree: BaseTree, data: dict) -> Prepared:
+    tree.merge(data)
+    keys = list(_dotted_keys(data))
+    return partial(_get_all, tree, keys), len(keys)
+
+
+def _dotted_keys(data: dict, prefix: str = ""):
+    for key, value in data.items():
+        yield prefix + key
+        if isinstance(value, dict):
+            yield from _dotted_keys(value, f"{prefix}{key}.")
+
+
+def _get_all(tree: BaseTree, keys: list[str]):
+    for key in keys:
+        tree.get(key)
+
+
+def _merge_all(base: dict, layers: list[dict]):
+    for layer in layers:
+        Merger.merge(base, layer)
+
+
+def _diff_all(diff_fn: Callable, pairs: list[tuple]) -> list:
+    # diffs are kept alive, so peak memory accounts for all of them
+    return [diff_fn(old, new) for old, new in pairs]
+
+
+def object_sizes() -> dict[str, int]:
+    """
+    Return the size in bytes of an instance of the objects allocated per node
+    during a merge (including its __dict__, for non-slotted classes).
+    """
+    samples = {
+        "KeyDiff": KeyDiff("key", "old", "new", "key", "key"),
+        "MergePolicy": MergePolicy(),
+        "MergePolicyNode": MergePolicyNode("key", MergePolicy()),
+        "LazyPath": LazyPath(None, "key"),
+    }
+    return {name: _sizeof(obj) for name, obj in samples.items()}
+
+
+def _sizeof(obj) -> int:
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def run_benchmark(
+    benchmark: Benchmark, spec: TreeSpec, repeat: int = 5, warmup: int = 1
+) -> dict:
+    """Time @benchmark @repeat times and measure its peak memory once."""
+    old, new = generate_pair(spec)
+
+    def prepare() -> Prepared:
+        return benchmark.prepare(copy.deepcopy(old), copy.deepcopy(new), spec)
+
+    timings = []
+    for i in range(warmup + repeat):
+        fn, nodes = prepare()
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if i >= warmup:
+            timings.append(elapsed)
+
+    # tracemalloc slows down execution, so memory is measured in a separate run
+    fn, nodes = prepare()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "name": benchmark.name,
+        "nodes": nodes,
+        "repeat": repeat,
+        "min_s": min(timings),
+        "median_s": median,
+        "mean_s": statistics.fmean(timings),
+        "ops_per_sec": 1 / median if median else None,
+        "ns_per_node": median / nodes * 1e9 if nodes else None,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def run(
+    spec: TreeSpec, names: list[str] | None = None, repeat: int = 5, warmup: int = 1
+) -> dict:
+    """Run the selected benchmarks (all by default) and return a JSON-able report."""
+    names = names or list(BENCHMARKS)
+    results = [
+        run_benchmark(BENCHMARKS[name], spec, repeat, warmup) for name in names
+    ]
+    return {
+        "meta": _meta(),
+        "spec": spec.as_dict(),
+        "results": results,
+        "object_sizes": object_sizes(),
+    }
+
+
+def compare(report: dict, previous: dict) -> list[dict]:
+    """Return median-time ratios (current/previous) for benchmarks in both reports."""
+    previous_results = {r["name"]: r for r in previous["results"]}
+    comparison = []
+    for result in report["results"]:
+        before = previous_results.get(result["name"])
+        if before is None:
+            continue
+        comparison.append(
+            {
+                "name": result["name"],
+                "time_ratio": result["median_s"] / before["median_s"],
+                "memory_ratio": (
+                    result["peak_memory_bytes"] / before["peak_memory_bytes"]
+                    if before["peak_memory_bytes"]
+                    else None
+                ),
+            }
+        )
+    return comparison
+
+
+def format_report(report: dict, comparison: list[dict] | None = None) -> str:
+    ratios = {c["name"]: c for c in comparison or []}
+    lines = [
+        f"{'benchmark':<28}{'ops/sec':>12}{'ns/node':>12}{'peak KiB':>12}"
+        + (f"{'time x':>10}{'mem x':>10}" if ratios else "")
+    ]
+    for result in report["results"]:
+        line = (
+            f"{result['name']:<28}"
+            + _format_number(result["ops_per_sec"], 12, 2)
+            + _format_number(result["ns_per_node"], 12, 1)
+            + _format_number(result["peak_memory_bytes"] / 1024, 12, 1)
+        )
+        ratio = ratios.get(result["name"])
+        if ratio:
+            line += _format_number(ratio["time_ratio"], 10, 2)
+            line += _format_number(ratio["memory_ratio"], 10, 2)
+        lines.append(line)
+
+    object_sizes = report.get("object_sizes")
+    if object_sizes:
+        lines.append("")
+        lines.append(f"{'object':<28}{'bytes':>12}")
+        for name, size in object_sizes.items():
+            lines.append(f"{name:<28}{size:>12}")
+    return "\n".join(lines)
+
+
+def _format_number(value: float | None, width: int, precision: int) -> str:
+    if value is None:
+        return f"{'-':>{width}}"
+    return f"{value:>{width}.{precision}f}"
+
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    defaults = TreeSpec()
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--width", type=int, default=defaults.width)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--list-length", type=int, default=defaults.list_length)
+    parser.add_argument("--mark-density", type=float, default=defaults.mark_density)
+    parser.add_argument("--change-ratio", type=float, default=defaults.change_ratio)
+    parser.add_argument("--extra-ratio", type=float, default=defaults.extra_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=list(BENCHMARKS),
+        help="run only this benchmark (may be repeated)",
+    )
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of a previous run")
+    parser.add_argument("--list", action="store_true", help="list benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for benchmark in BENCHMARKS.values():
+            print(f"{benchmark.name:<28}{benchmark.description}")
+        return 0
+
+    spec = TreeSpec(
+        width=args.width,
+        depth=args.depth,
+        list_length=args.list_length,
+        mark_density=args.mark_density,
+        change_ratio=args.change_ratio,
+        extra_ratio=args.extra_ratio,
+        seed=args.seed,
+    )
+    report = run(spec, args.only, args.repeat, args.warmup)
+
+    comparison = None
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare(report, json.load(f))
+        report["comparison"] = comparison
+
+    print(format_report(report, comparison))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
@@ -0,0 +1,171 @@
+"""
+Synthetic settings-tree generation.
+
+Trees are generated from a TreeSpec and a seed, so the same spec always
+produces the same (old, new) pair. Both sides share the same shape for common
+keys (dicts stay dicts, lists keep their length), which mirrors the usual case
+of layering environment files over a base settings file.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class TreeSpec:
+    """
+    Shape parameters of a synthetic settings tree.
+
+    Args:
+        width: number of keys in each dict level
+        depth: number of nested dict levels (1 means a flat dict)
+        list_length: number of items in each list value
+        mark_density: probability of a new container carrying a dynaconf mark
+        change_ratio: probability of a new leaf being different from the old one
+        extra_ratio: probability of each dict level receiving a new-only key
+        seed: random seed
+    """
+
+    width: int = 10
+    depth: int = 3
+    list_length: int = 5
+    mark_density: float = 0.0
+    change_ratio: float = 0.5
+    extra_ratio: float = 0.2
+    seed: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def generate_pair(spec: TreeSpec) -> tuple[dict, dict]:
+    """
+    Return an (old, new) pair of settings trees following @spec.
+
+    Both trees are wrapped in a "root" key, following the tests convention,
+    so the root-level policies of the merger are exercised.
+    """
+    rng = random.Random(spec.seed)
+    old = _generate_dict(spec, rng, level=1)
+    new = _derive_dict(old, spec, rng, level=1)
+    return {"root": old}, {"root": new}
+
+
+def generate_layers(spec: TreeSpec, count: int) -> tuple[dict, list[dict]]:
+    """
+    Return a (base, layers) pair, where each of the @count layers is derived
+    from base following @spec, as in a base settings file and its overrides.
+    """
+    rng = random.Random(spec.seed)
+    base = _generate_dict(spec, rng, level=1)
+    layers = [{"root": _derive_dict(base, spec, rng, level=1)} for _ in range(count)]
+    return {"root": base}, layers
+
+
+def generate_records(spec: TreeSpec, offset: int = 0) -> list[dict]:
+    """
+    Return a list of @spec.list_length records (dicts with a nested list),
+    as in service-registry like settings. Records are numbered from @offset.
+    """
+    return [
+        {
+            "name": f"service_{i}",
+            "port": 1024 + i,
+            "tags": [f"tag_{i % 7}", f"tag_{i % 11}"],
+        }
+        for i in range(offset, offset + spec.list_length)
+    ]
+
+
+def generate_strings(spec: TreeSpec, count: int) -> list:
+    """
+    Return a list of @count plain strings (as in allowed hosts like settings),
+    where each item is replaced by a list mark with @spec.mark_density.
+    """
+    rng = random.Random(spec.seed)
+    marks = ["dynaconf_merge", "dynaconf_merge_unique", "@empty"]
+    return [
+        rng.choice(marks)
+        if rng.random() < spec.mark_density
+        else f"host-{rng.randrange(1 << 16)}.example.com"
+        for _ in range(count)
+    ]
+
+
+def count_nodes(value) -> int:
+    """Count every value in the tree (containers and terminals)."""
+    count = 1
+    if isinstance(value, dict):
+        for child in value.values():
+            count += count_nodes(child)
+    elif isinstance(value, list):
+        for child in value:
+            count += count_nodes(child)
+    return count
+
+
+def iter_container_pairs(old, new, kind: type):
+    """Yield (old, new) container pairs of type @kind found at the same path."""
+    if isinstance(old, kind) and isinstance(new, kind):
+        yield old, new
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, old_value in old.items():
+            if key in new:
+                yield from iter_container_pairs(old_value, new[key], kind)
+    elif isinstance(old, list) and isinstance(new, list):
+        for old_value, new_value in zip(old, new):
+            yield from iter_container_pairs(old_value, new_value, kind)
+
+
+def _generate_dict(spec: TreeSpec, rng: random.Random, level: int) -> dict:
+    data = {}
+    for i in range(spec.width):
+        key = f"key_{i}"
+        kind = i % 3
+        if kind == 0 and level < spec.depth:
+            data[key] = _generate_dict(spec, rng, level + 1)
+        elif kind == 1:
+            data[key] = [_terminal(rng) for _ in range(spec.list_length)]
+        else:
+            data[key] = _terminal(rng)
+    return data
+
+
+def _derive_dict(old: dict, spec: TreeSpec, rng: random.Random, level: int) -> dict:
+    data = {}
+    for key, old_value in old.items():
+        if isinstance(old_value, dict):
+            data[key] = _derive_dict(old_value, spec, rng, level + 1)
+        elif isinstance(old_value, list):
+            data[key] = _derive_list(old_value, spec, rng)
+        elif rng.random() < spec.change_ratio:
+            data[key] = _terminal(rng)
+        else:
+            data[key] = old_value
+
+    if rng.random() < spec.extra_ratio:
+        data[f"extra_{level}_{rng.randrange(1 << 16)}"] = _terminal(rng)
+    if rng.random() < spec.mark_density:
+        data["dynaconf_merge"] = rng.random() < 0.5
+    return data
+
+
+def _derive_list(old: list, spec: TreeSpec, rng: random.Random) -> list:
+    data = [
+        _terminal(rng) if rng.random() < spec.change_ratio else item for item in old
+    ]
+    if data and rng.random() < spec.mark_density:
+        data.append("dynaconf_merge")
+    return data
+
+
+def _terminal(rng: random.Random):
+    kind = rng.randrange(4)
+    if kind == 0:
+        return rng.randrange(1 << 16)
+    elif kind == 1:
+        return f"value_{rng.randrange(1 << 16)}"
+    elif kind == 2:
+        return rng.random() < 0.5
+    return rng.random()
@@ -6,20 +6,82 @@ container, such as dicts and lists.
 """
 from __future__ import annotations
 
-from typing import NamedTuple, Literal
+from typing import Any, Iterator, NamedTuple, Literal
 from dynamerge.merge_policy import MergePolicy
+from dynamerge.fingerprint import Fingerprinter
 
 
 class PseudoIdStrategies:
+    @staticmethod
+    def for_policy(merge_policy: MergePolicy):
+        """
+        Return the strategy for lists merged with @merge_policy:
+        - merge_unique: use_content_hash (equal items are matched, so new ones
+          are appended only if not found in old)
+        - merge: use_side_index (items never match, so new ones are appended)
+        - otherwise: use_index (items are matched by position)
+
+        With merge or merge_unique, dicts with a merge_policy.dict_id_key are
+        matched by their id instead (see dict_id), so records can be merged.
+        """
+        if merge_policy.merge_unique:
+            return PseudoIdStrategies.use_content_hash
+        if merge_policy.merge:
+            return PseudoIdStrategies.use_side_index
+        return PseudoIdStrategies.use_index
+
     @staticmethod
     def use_index(unique_name: str, container: list, *args, **kwargs) -> dict:
         return {i: i for i, e in enumerate(container)}
 
+    @staticmethod
+    def use_side_index(
+        unique_name: str,
+        container: list,
+        dict_key_override: str | None = None,
+        fingerprinter: Fingerprinter | None = None,
+        **kwargs,
+    ) -> dict:
+        """
+        Use (unique_name, index) as element id, so ids never match across lists.
+        Dicts with a @dict_key_override key use their dict_id instead, except
+        for repeated ids: only the first dict with an id is matched by it.
+        """
+        dict_id = PseudoIdStrategies.dict_id
+        id_map = {}
+        for i, e in enumerate(container):
+            pseudo_id = None
+            if type(e) is dict:
+                pseudo_id = dict_id(e, dict_key_override, fingerprinter)
+            if pseudo_id is None or pseudo_id in id_map:
+                pseudo_id = (unique_name, i)
+            id_map[pseudo_id] = i
+        return id_map
+
+    @staticmethod
+    def dict_id(
+        item: dict, dict_key: str | None, fingerprinter: Fingerprinter | None = None
+    ) -> Any:
+        """
+        Return the (dict_key, id) pseudo-id of a dict @item with the @dict_key key
+        (as in {"name": "a", ...} with dict_key="name"), or None.
+        Unlike use_value_hash, the id is not popped from the dict.
+        """
+        if dict_key is None or dict_key not in item:
+            return None
+        pseudo_id = item[dict_key]
+        try:
+            hash(pseudo_id)
+        except TypeError:
+            pseudo_id = (fingerprinter or Fingerprinter()).canonical(pseudo_id)
+        return (dict_key, pseudo_id)
+
     @staticmethod
     def use_value_hash(
         unique_name: str,
         container: list,
         dict_key_override: str | None = None,
+        fingerprinter: Fingerprinter | None = None,
         **kwargs,
     ) -> dict:
         """
@@ -28,6 +90,7 @@ class PseudoIdStrategies:
         - lookup for id markup inside it. e.g. [1, {dynaconf_id="foo", ...}, 3]
           or custom @dict_key_id provided by the user.
         - use incremental id (__@unique_name_i__, i=0; i++) (unique inside scope)
+        Other unhashable values use their canonical form (see use_content_hash).
         """
         return_dict = {}
         dict_key_name = "dynaconf_id"
@@ -53,10 +116,44 @@ class PseudoIdStrategies:
                         )
                     ] = i
             else:
-                return_dict[e] = i
+                try:
+                    return_dict[e] = i
+                except TypeError:
+                    fingerprinter = fingerprinter or Fingerprinter()
+                    return_dict[fingerprinter.canonical(e)] = i
 
         return return_dict
 
+    @staticmethod
+    def use_content_hash(
+        unique_name: str,
+        container: list,
+        fingerprinter: Fingerprinter | None = None,
+        dict_key_override: str | None = None,
+        **kwargs,
+    ) -> dict:
+        """
+        Use the canonical form of the value content as element id.
+
+        Nested dicts/lists (or other unhashable values) get the same id in the old
+        and new lists when they are equal, and canonical forms are memoized by
+        @fingerprinter, so sharing it during a merge makes mapping O(n).
+        Dicts with a @dict_key_override key use its (key, value) as id instead,
+        except for repeated ids (see use_side_index). Repeated ids are mapped to
+        their first item.
+        """
+        canonical = (fingerprinter or Fingerprinter()).canonical
+        dict_id = PseudoIdStrategies.dict_id
+        id_map = {}
+        for i, e in enumerate(container):
+            pseudo_id = None
+            if type(e) is dict:
+                pseudo_id = dict_id(e, dict_key_override, fingerprinter)
+            if pseudo_id is None or pseudo_id in id_map:
+                pseudo_id = canonical(e)
+            id_map.setdefault(pseudo_id, i)
+        return id_map
+
 
 class KeyDiffer:
     """
@@ -65,6 +162,13 @@ class KeyDiffer:
     This is mostly usefull for generalizing compares among list and dicts and
     providing a flexible way of mapping their key-diffs with custom value compares
     or merging strategies.
+
+    The iter_* functions yield KeyDiffs lazily, so they can be consumed while
+    merging. The diff_* functions are list wrappers around them.
+
+    Diffs are yielded in a deterministic order, in a single linear pass: old keys
+    (or list items) in old's order, then new-only keys in new's order. Thus
+    new-only values are appended in the order they appear in new.
     """
 
     pseudo_id_strategies = PseudoIdStrategies
@@ -77,12 +181,7 @@ class KeyDiffer:
         **kwargs,
     ) -> list[KeyDiff]:
         """Return a KeyDiff lists from containers (lists or dicts types)."""
-        if isinstance(old, dict) and isinstance(new, dict):
-            return KeyDiffer.diff_dict(old, new, merge_policy, **kwargs)
-        elif isinstance(old, list) and isinstance(new, list):
-            return KeyDiffer.diff_list(old, new, merge_policy, **kwargs)
-        else:
-            raise TypeError("Can diff only dicts or lists togheter")
+        return list(KeyDiffer.iter_container(old, new, merge_policy, **kwargs))
 
     @staticmethod
     def diff_dict(
@@ -91,17 +190,7 @@ class KeyDiffer:
         merge_policy: MergePolicy = None,
     ) -> list[KeyDiff]:
         """Return a KeyDiff lists (old,new)."""
-        merge_policy = merge_policy or MergePolicy()
-        diffs = []
-
-        union_keys = old.keys() | new.keys()
-        for id_key in union_keys:
-            diff_pair = (old.get(id_key), new.get(id_key))
-            real_key_pair = (id_key, id_key)  # this is usefull only for lists
-
-            diff_object = KeyDiff(id_key, diff_pair, real_key_pair)
-            diffs.append(diff_object)
-        return diffs
+        return list(KeyDiffer.iter_dict(old, new, merge_policy))
 
     @staticmethod
     def diff_list(
@@ -109,39 +198,89 @@ class KeyDiffer:
         new: list,
         merge_policy: MergePolicy = None,
         pseudo_id_strategy=None,
+        **kwargs,
     ) -> list[KeyDiff]:
         """Return a KeyDiff lists (old,new)."""
-        pseudo_id_mapper = pseudo_id_strategy or PseudoIdStrategies.use_index
+        return list(
+            KeyDiffer.iter_list(old, new, merge_policy, pseudo_id_strategy, **kwargs)
+        )
+
+    @staticmethod
+    def iter_container(
+        old: dict | list,
+        new: dict | list,
+        merge_policy: MergePolicy = None,
+        **kwargs,
+    ) -> Iterator[KeyDiff]:
+        """
+        Yield KeyDiffs lazily from containers (lists or dicts types).
+        Extra @kwargs are passed to the list pseudo-id strategy.
+        """
+        if isinstance(old, dict) and isinstance(new, dict):
+            return KeyDiffer.iter_dict(old, new, merge_policy)
+        elif isinstance(old, list) and isinstance(new, list):
+            return KeyDiffer.iter_list(old, new, merge_policy, **kwargs)
+        else:
+            raise TypeError("Can diff only dicts or lists togheter")
+
+    @staticmethod
+    def iter_dict(
+        old: dict,
+        new: dict,
+        merge_policy: MergePolicy = None,
+    ) -> Iterator[KeyDiff]:
+        """
+        Yield KeyDiffs (old,new) lazily: old keys first, then new-only keys.
+
+        Keys of @old may be re-assigned while iterating (e.g, by a patcher),
+        but no key should be added to @old before the new-only keys are reached.
+        """
+        for id_key, old_value in old.items():
+            # real_key_pair is usefull only for lists
+            yield KeyDiff(id_key, old_value, new.get(id_key), id_key, id_key)
+
+        for id_key, new_value in new.items():
+            if id_key not in old:
+                yield KeyDiff(id_key, None, new_value, id_key, id_key)
+
+    @staticmethod
+    def iter_list(
+        old: list,
+        new: list,
+        merge_policy: MergePolicy = None,
+        pseudo_id_strategy=None,
+        **kwargs,
+    ) -> Iterator[KeyDiff]:
+        """
+        Yield KeyDiffs (old,new) lazily: old items first, then new-only items.
+        Extra @kwargs are passed to the pseudo-id strategy (e.g, a fingerprinter),
+        which is chosen by @merge_policy when not given (see for_policy).
+        """
         merge_policy = merge_policy or MergePolicy()
-        diffs = []
+        pseudo_id_mapper = pseudo_id_strategy or PseudoIdStrategies.for_policy(
+            merge_policy
+        )
 
         # maps {old.pseudo_id -> old.index},
         # - pseudo_id is a generated id from the list-item (for identify comparision)
         # - index is the address of the item in the original list
         old_pseudo_id_map = pseudo_id_mapper(
-            "old", old, dict_key_override=merge_policy.dict_id_key
+            "old", old, dict_key_override=merge_policy.dict_id_key, **kwargs
         )
         new_pseudo_id_map = pseudo_id_mapper(
-            "new", new, dict_key_override=merge_policy.dict_id_key
+            "new", new, dict_key_override=merge_policy.dict_id_key, **kwargs
         )
 
-        union_keys = old_pseudo_id_map.keys() | new_pseudo_id_map.keys()
-        for id_key in union_keys:
-            # get index from pseudo_id
-            old_index_key = old_pseudo_id_map.get(id_key, None)
+        for id_key, old_index_key in old_pseudo_id_map.items():
             new_index_key = new_pseudo_id_map.get(id_key, None)
-
-            # get value from index
-            old_value = old[old_index_key] if old_index_key is not None else None
             new_value = new[new_index_key] if new_index_key is not None else None
+            yield KeyDiff(
+                id_key, old[old_index_key], new_value, old_index_key, new_index_key
+            )
 
-            # populate KeyDiff
-            diff_pair = (old_value, new_value)
-            real_key_pair = (old_index_key, new_index_key)
-
-            diff_object = KeyDiff(id_key, diff_pair, real_key_pair)
-            diffs.append(diff_object)
-        return diffs
+        for id_key, new_index_key in new_pseudo_id_map.items():
+            if id_key not in old_pseudo_id_map:
+                yield KeyDiff(id_key, None, new[new_index_key], None, new_index_key)
 
 
 class KeyDiff(NamedTuple):
@@ -152,28 +291,43 @@ class KeyDiff(NamedTuple):
     The purpose of this is to allow a future diff-interpreter to apply different
     meanings to a key-conflict, providing more fine-control of the merging process.
 
-    For example, it could take Diff(id_key="a", diff_pair=(1,1)) and merge that
+    For example, it could take Diff(id_key="a", old=1, new=1) and merge that
     into "a" as  [1,1] or 2 ("a": [1,2] or "a": [1,2]).
 
+    It is a flat record (one tuple per key diff), as one is created for every key
+    of the merged trees. The diff_pair and real_key_pair views build new tuples.
+
     Args:
-        identity_key: The key used for id comparision (is a pseudo-key for list items)
-        diff_pair: A pair of (old, new) values
-        real_key_pair: A pair of (old-real-key, new-real-key).
-            In lists, it's the index. It may differ from identity_key, dependening
+        id_key: The key used for id comparision (is a pseudo-key for list items)
+        old, new: The (old, new) values
+        old_key, new_key: The (old-real-key, new-real-key).
+            In lists, it's the index. It may differ from id_key, dependening
             on the pseudo-key generation strategy.
 
     Examples:
         {a: A, b: B}
         {a: A, b: B, c: C}
         ------------------
-        Diff(a,    diff_pair=(A, A),        real_key_pair=(a, a))
-        Diff(b,    diff_pair=(B, B),        real_key_pair=(a, a))
-        Diff(c,    diff_pair=(EMPTY, B),    real_key_pair=(a, a))
+        Diff(a,    old=A,     new=A,    old_key=a,    new_key=a)
+        Diff(b,    old=B,     new=B,    old_key=b,    new_key=b)
+        Diff(c,    old=EMPTY, new=C,    old_key=None, new_key=c)
     """
 
     id_key: str
-    diff_pair: tuple
-    real_key_pair: tuple
+    old: Any
+    new: Any
+    old_key: Any
+    new_key: Any
+
+    @property
+    def diff_pair(self) -> tuple:
+        """The (old, new) values pair."""
+        return (self.old, self.new)
+
+    @property
+    def real_key_pair(self) -> tuple:
+        """The (old_key, new_key) pair."""
+        return (self.old_key, self.new_key)
 
 
 class DiffUtils:
@@ -211,7 +365,11 @@ class DiffUtils:
     def sort_diff_list(
         diff_list: list[KeyDiff], by_attr: str = "id_key", by_attr_secondary: str = None
     ):
-        """Sort this diff_list in-place by key"""
+        """
+        Return a copy of diff_list sorted by key.
+        KeyDiffer output order is already deterministic, so this is only needed
+        for comparing with a differently ordered diff_list.
+        """
         _diff_list = diff_list.copy()
         _diff_list.sort(key=lambda item: str(getattr(item, by_attr)))
         return _diff_list
@@ -0,0 +1,106 @@
+"""
+Fingerprint module.
+
+Responsible for cheap structural comparisions of nested containers,
+such as dicts and lists.
+"""
+from __future__ import annotations
+
+from typing import Any, Hashable
+
+_atomic_types = {str, int, float, bool, bytes, type(None)}
+
+
+class Fingerprinter:
+    """
+    Compute structural digests and canonical forms of nested dicts and lists,
+    memoized per object.
+
+    The memo is keyed by object identity, so an instance is meant to live only
+    during a single merge, where containers are not modified before being
+    compared (or are forgotten when they are). A digest is a plain hash: equal
+    digests must still be confirmed with an equality check. A canonical form is
+    exact, and can be used as id.
+    """
+
+    def __init__(self):
+        # {id(container) -> (digest, container)}
+        # the container is kept so its id can't be reused by other object
+        self._memo: dict[int, tuple[int, Any]] = {}
+        self._canonical_memo: dict[int, tuple[Hashable, Any]] = {}
+
+    def digest(self, value: Any) -> int:
+        """Return a structural hash of @value, consistent with `==`."""
+        value_type = type(value)
+        if value_type is dict or value_type is list:
+            memo = self._memo.get(id(value))
+            if memo is not None:
+                return memo[0]
+            if value_type is dict:
+                digest = hash(frozenset((k, self.digest(v)) for k, v in value.items()))
+            else:
+                digest = hash(tuple(self.digest(v) for v in value))
+            self._memo[id(value)] = (digest, value)
+            return digest
+
+        try:
+            return hash(value)
+        except TypeError:
+            # equal unhashable values must share a digest
+            return 0
+
+    def forget(self, value: Any):
+        """Drop the memos of a container @value, e.g, once it was modified."""
+        self._memo.pop(id(value), None)
+        self._canonical_memo.pop(id(value), None)
+
+    def canonical(self, value: Any) -> Hashable:
+        """
+        Return a hashable form of @value, which is equal for equal values.
+
+        Hashable values are their own canonical form. Containers are tagged with
+        their type, and dicts (and sets) don't depend on the items order:
+            [1, {"a": [2]}] -> (list, (1, (dict, frozenset({("a", (list, (2,)))}))))
+        """
+        value_type = type(value)
+        if value_type in _atomic_types:
+            return value
+        if value_type is dict or value_type is list:
+            memo = self._canonical_memo.get(id(value))
+            if memo is not None:
+                return memo[0]
+            if value_type is dict:
+                canonical = (
+                    dict,
+                    frozenset((k, self.canonical(v)) for k, v in value.items()),
+                )
+            else:
+                canonical = (list, tuple(self.canonical(v) for v in value))
+            self._canonical_memo[id(value)] = (canonical, value)
+            return canonical
+
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            ...
+        if isinstance(value, (set, frozenset)):
+            return (frozenset, frozenset(self.canonical(v) for v in value))
+        if isinstance(value, tuple):
+            return (tuple, tuple(self.canonical(v) for v in value))
+        # no structural form known: only the same object is equal to itself
+        return (object, id(value))
+
+    def identical(self, old: Any, new: Any) -> bool:
+        """
+        Return True if @old and @new are the same container or equal containers.
+        Terminals are never considered identical, as they are cheap to replace.
+        """
+        if old is new:
+            return type(old) is dict or type(old) is list
+        old_type = type(old)
+        if old_type is not type(new) or (old_type is not dict and old_type is not list):
+            return False
+        if len(old) != len(new):
+            return False
+        return self.digest(old) == self.digest(new) and old == new
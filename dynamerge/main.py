@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+from dynamerge.marks import LazyGraph, LazyGraphCycleError, TreePath
 from dynamerge.merger import Merger, MergePolicy, TreePatch
 
+_MISSING = object()
+
 
 class BaseTree:
     """
@@ -9,42 +16,388 @@ class BaseTree:
     that is, the base_dict containing all the settings.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache_size: int = 1024,
+        path_index: bool = False,
+        path_index_size: int | None = None,
+    ):
         self.base_dict = {}
-        self.lazy_tree = LazyTree()
+        self.lazy_tree = LazyTree(cache_size)
+        self.path_index = (
+            PathIndex(path_index_size)
+            if path_index or path_index_size is not None
+            else None
+        )
         self.default_tree = DefaultTree()
         self.merger = Merger
         self.base_merge_policy = MergePolicy()
-        self.stats = {"merge_operations_count"}
+        self.stats = {"merge_operation_count": 0, "cache_hits": 0, "cache_misses": 0}
 
     def merge(self, other: dict):
-        self.merger.merge_containers(self, other)
-        merge_result = self.merger.result
+        merge_result = self.merger.merge(self.base_dict, other)
 
         self.stats["merge_operation_count"] += merge_result.merge_operation_count
-        self.lazy_tree.update_with_patch(merge_result.tree_patch)
+        self._update_with_patch(merge_result.tree_patch)
 
-    def get(self, key):
+    def _update_with_patch(self, patch: TreePatch):
+        self.lazy_tree.update_with_patch(patch)
+        if self.path_index is not None:
+            self.path_index.update_with_patch(self.base_dict, patch)
+
+    def get(self, key: str | TreePath, default: Any = None):
         """
         Get value internally, optionally triggering re-evaluation, pre and pos hooks,
         and fallback to defaults (kind of a hook).
+
+        @key is a path tuple or a dotted-key string ("a.b.c"). Lazy values are
+        evaluated on read and cached until a merge touches their dependencies.
+        With a path index, dotted-key reads of plain values are a single lookup.
+        """
+        if self.lazy_tree.lazy_values:
+            path = _as_path(key)
+            if path in self.lazy_tree:
+                value, hit = self.lazy_tree.get_evaluated(path, self.get)
+                self.stats["cache_hits" if hit else "cache_misses"] += 1
+                return value
+
+        if self.path_index is not None and type(key) is str:
+            value = self.path_index.get(key, self.base_dict)
+        else:
+            value = _walk(self.base_dict, _as_path(key))
+        return default if value is _MISSING else value
+
+    def set(self, key: str | TreePath, value: Any):
+        """
+        Shortcut for setting a single key. Trigger a simpe merge.
+
+        The value at @key is replaced (dicts and lists are not merged), and
+        missing containers along @key are created. A list replacing a list is
+        set in place, as merges can't drop list items.
         """
+        path = _as_path(key)
+        # marks are only needed where the path meets existing containers:
+        # missing paths are added as they are, so they must not carry marks
+        existing = []
+        node = self.base_dict
+        for k in path:
+            node = node.get(k, _MISSING) if type(node) is dict else _MISSING
+            existing.append(node)
+
+        # replace (not merge) a dict or list value, as for any other value
+        current = existing[-1]
+        if type(value) is list and type(current) is list:
+            # a merged list never drops old items (they are matched by position
+            # or appended), so it is replaced in place and patched as the merger
+            parent = existing[-2] if len(path) > 1 else self.base_dict
+            parent[path[-1]] = value
+            patch = TreePatch()
+            patch.append(path, TreePatch.REPLACED)
+            self.stats["merge_operation_count"] += 1
+            self._update_with_patch(patch)
+            return
+
+        other = value
+        if type(value) is dict:
+            other = {**value}
+            if type(current) is dict:
+                other["dynaconf_merge"] = False
+        for i in range(len(path) - 1, -1, -1):
+            other = {path[i]: other}
+            # keep the siblings of the path (the top level is always merged)
+            if i and type(existing[i - 1]) is dict:
+                other["dynaconf_merge"] = True
+        self.merge(other)
+
+
+def _as_path(key: str | TreePath) -> TreePath:
+    if type(key) is str:
+        return _split_dotted_key(key)
+    return tuple(key)
+
+
+@lru_cache(maxsize=4096)
+def _split_dotted_key(key: str) -> TreePath:
+    return tuple(key.split("."))
+
+
+def _walk(tree: dict, path: TreePath) -> Any:
+    """Return the value at @path of @tree, or _MISSING."""
+    value = tree
+    try:
+        for key in path:
+            value = value[key]
+    except (KeyError, IndexError, TypeError):
+        return _MISSING
+    return value
+
+
+class PathIndex:
+    """
+    A flattened {dotted-key: value} index of a tree, so reads of dotted keys
+    ("a.b.c") are a single lookup.
+
+    By default every dict path of the tree is indexed, except for keys which
+    aren't strings or contain dots (list items and those keys are read by
+    walking the tree). If @maxsize is given, only the keys which are read are
+    indexed, keeping the @maxsize most recently used.
+
+    The index is kept up to date with the merge patches of the tree.
+    """
+
+    def __init__(self, maxsize: int | None = None):
+        self.maxsize = maxsize
+        self._values: dict | LRUCache = {} if maxsize is None else LRUCache(maxsize)
+
+    @property
+    def bounded(self) -> bool:
+        return self.maxsize is not None
+
+    def get(self, key: str, tree: dict) -> Any:
+        """Return the value at the dotted @key of @tree, or _MISSING."""
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            value = _walk(tree, _split_dotted_key(key))
+            if value is not _MISSING and self.bounded:
+                self._values[key] = value
+        return value
+
+    def build(self, tree: dict):
+        """Index @tree from scratch."""
+        self._values = {} if self.maxsize is None else LRUCache(self.maxsize)
+        if not self.bounded:
+            self._index_children("", tree)
+
+    def update_with_patch(self, tree: dict, patch: TreePatch):
+        """Update the paths of @tree changed by @patch (added or replaced)."""
+        if patch is None:
+            return
+        changed_paths = [
+            path
+            for path, op in patch
+            if op == TreePatch.ADDED or op == TreePatch.REPLACED
+        ]
+        if self.bounded:
+            self._discard_stale(changed_paths)
+        else:
+            for path in changed_paths:
+                self._reindex(tree, path)
+
+    def _discard_stale(self, changed_paths: list[TreePath]):
+        # a read key is stale if it is, contains or is under a changed path
+        changed = set()
+        containers = set()
+        for path in changed_paths:
+            keys = _indexable_prefixes(path)
+            containers.update(keys)
+            if len(keys) == len(path):
+                changed.add(keys[-1])
+        for key in list(self._values):
+            if key in containers or any(
+                key[:i] in changed for i, c in enumerate(key) if c == "."
+            ):
+                self._values.pop(key)
+
+    def _reindex(self, tree: dict, path: TreePath):
+        # refresh the containers on the way, and the whole changed subtree
+        node = tree
+        keys = _indexable_prefixes(path)
+        for depth, key in enumerate(keys):
+            if type(node) is not dict or path[depth] not in node:
+                return
+            node = node[path[depth]]
+            if depth == len(path) - 1:
+                self._discard_subtree(key)
+                self._index_subtree(key, node)
+            else:
+                self._values[key] = node
+
+    def _discard_subtree(self, key: str):
+        old = self._values.pop(key, _MISSING)
+        if type(old) is dict:
+            for child in old:
+                if _is_indexable(child):
+                    self._discard_subtree(f"{key}.{child}")
+
+    def _index_subtree(self, key: str, value: Any):
+        self._values[key] = value
+        if type(value) is dict:
+            self._index_children(f"{key}.", value)
 
-    def set(self, key, value):
-        """Shortcut for setting a single key. Trigger a simpe merge."""
+    def _index_children(self, prefix: str, value: dict):
+        for child_key, child in value.items():
+            if _is_indexable(child_key):
+                self._index_subtree(prefix + child_key, child)
+
+    def __contains__(self, key: str):
+        return key in self._values
+
+    def __len__(self):
+        return len(self._values)
+
+
+def _is_indexable(key: Any) -> bool:
+    return type(key) is str and "." not in key
+
+
+def _indexable_prefixes(path: TreePath) -> list[str]:
+    """Return the dotted keys of the prefixes of @path, up to a non-indexable key."""
+    keys = []
+    prefix = ""
+    for key in path:
+        if not _is_indexable(key):
+            break
+        prefix = prefix + "." + key if prefix else key
+        keys.append(prefix)
+    return keys
+
+
+class LRUCache:
+    """A mapping which keeps at most @maxsize items, evicting the least used."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
 
 
 class LazyTree:
     """
     A tree to store (path:lazy-object) data, so it can be re-evaluated
     without recursing the whole three.
+
+    A lazy value is a callable which receives a `get(path)` function (to read
+    its dependencies) and returns the evaluated value. Lazy values are marked
+    dirty when registered and when a merge patch touches their dependencies,
+    and only dirty values are re-evaluated, in dependency order.
+
+    Evaluated values are kept in a LRU cache of @cache_size paths, so evicted
+    values are re-evaluated on their next read.
     """
 
+    def __init__(self, cache_size: int = 1024):
+        self.graph = LazyGraph()
+        self.lazy_values: dict[TreePath, Callable[[Callable], Any]] = {}
+        self.evaluated = LRUCache(cache_size)
+        self.dirty: set[TreePath] = set()
+        self._evaluating: set[TreePath] = set()
+
+    def add(
+        self,
+        path: TreePath,
+        lazy_value: Callable[[Callable], Any],
+        *dependencies: TreePath,
+    ):
+        self.lazy_values[path] = lazy_value
+        self.graph.add(path, *dependencies)
+        self.mark_dirty([path])
+
+    def remove(self, path: TreePath):
+        del self.lazy_values[path]
+        self.graph.remove(path)
+        self.evaluated.pop(path, None)
+        self.dirty.discard(path)
+        self.mark_dirty([path])
+
+    def mark_dirty(self, changed_paths: Iterable[TreePath]) -> set[TreePath]:
+        """Mark the lazy values affected by @changed_paths and return them."""
+        changed_paths = list(changed_paths)
+        dirty = self.graph.affected_by(changed_paths)
+        dirty.update(path for path in changed_paths if path in self.graph)
+        self.dirty |= dirty
+        for path in dirty:
+            self.evaluated.pop(path)
+        return dirty
+
+    def get_evaluated(
+        self, path: TreePath, get: Callable[[TreePath], Any]
+    ) -> tuple[Any, bool]:
+        """
+        Return the (value, cache_hit) of the lazy value at @path, evaluating it
+        if it is dirty or not cached. @get is passed to the lazy value.
+        """
+        if path not in self.dirty:
+            value = self.evaluated.get(path, _MISSING)
+            if value is not _MISSING:
+                return value, True
+
+        if path in self._evaluating:
+            raise LazyGraphCycleError(f"Cyclic lazy value dependencies in {path}")
+        self._evaluating.add(path)
+        try:
+            value = self.lazy_values[path](get)
+        finally:
+            self._evaluating.discard(path)
+        self.evaluated[path] = value
+        self.dirty.discard(path)
+        return value, False
+
     def update_with_patch(self, patch: TreePatch):
         """
         Updates self according to operations related to Lazy values, such
         as updating, deleting or adding a LazyValue.
+
+        Lazy values replaced by the merge (at or under an added/replaced path)
+        are removed, and the ones depending on changed paths are marked dirty.
+        Merged containers are not changes themselves: their changed children
+        are recorded in the patch.
+        """
+        if patch is None:
+            return set()
+        changed_paths = [
+            path
+            for path, op in patch
+            if op == TreePatch.ADDED or op == TreePatch.REPLACED
+        ]
+        for path in changed_paths:
+            for lazy_path in self.graph.paths_under(path):
+                self.remove(lazy_path)
+        return self.mark_dirty(changed_paths)
+
+    def __contains__(self, path: TreePath):
+        return path in self.lazy_values
+
+    def evaluate_dirty(self, get: Callable[[TreePath], Any]) -> list[TreePath]:
+        """
+        Re-evaluate the dirty lazy values in dependency order, storing the
+        results in self.evaluated, and return their paths.
+        @get is passed to the lazy values, to read the (evaluated) tree.
         """
+        order = self.graph.topological_order(self.dirty)
+        for path in order:
+            self.evaluated[path] = self.lazy_values[path](get)
+            self.dirty.discard(path)
+        return order
 
 
 class DefaultTree:
@@ -1,7 +1,9 @@
 from __future__ import annotations
-from typing import Any
+from typing import Any, Iterable, Iterator
 from dynamerge.merge_policy import MergePolicy, MergePolicyNode
 import dataclasses
+import heapq
+from functools import lru_cache
 
 TreePath = tuple[str | int, ...]
 
@@ -15,71 +17,119 @@ class MarkupParser:
 
     def parse_tree(self):
         """Parse a dict-tree structure and return result with relevant data"""
-        self.merge_policy_tree = self._recursive_parse(
-            ("root",), self._base_dict, MergePolicy()
-        )
+        self.merge_policy_tree = self._parse(("root",), self._base_dict)
         return MarkupParserResult(
             self.merge_policy_tree, self.lazy_value_map, self.lazy_value_graph
         )
 
-    def _recursive_parse(
-        self, path: TreePath, value: dict | list | Any, parent_merge_policy: MergePolicy
-    ):
-        # NOTE: this strategy traverse this level twice: one for parsing scope
-        # marks and other for recursing inside containers.
-        # It is possible to do in one round, but care should be taken to not
-        # mess with index values. The index passed to the recursion should be
-        # the one after removing the marks).
-        if isinstance(value, dict):
-            mark_list = ScopeParser.parse_from_dict(value)
-            result_pair = self._merge_policy_override_process(
-                parent_merge_policy, mark_list, path
-            )
-            current_merge_policy, next_merge_policy = result_pair
-            node = MergePolicyNode(path[-1], current_merge_policy)
-            for k, v in value.items():
-                node.add_child(
-                    self._recursive_parse(path + tuple(k), v, next_merge_policy)
-                )
-            return node
-        elif isinstance(value, list):
-            mark_list = ScopeParser.parse_from_list(value)
-            result_pair = self._merge_policy_override_process(
-                parent_merge_policy, mark_list, path
-            )
-            current_merge_policy, next_merge_policy = result_pair
-            node = MergePolicyNode(path[-1], current_merge_policy)
-            for k, v in enumerate(value):
-                self._recursive_parse(path + type(k), v, next_merge_policy)
-            return node
-        elif is_token_string(value):
+    def _parse(self, path: TreePath, value: dict | list | Any) -> MergePolicyNode:
+        """
+        Parse @value in a single pass: container marks are stripped while its
+        items are visited, and recorded in the returned MergePolicyNode tree.
+
+        Containers are walked with an explicit stack, so deep trees don't hit the
+        recursion limit. Their nodes are built in reverse visiting order, once the
+        nodes of their children (and so their level marks) are known.
+        """
+        if not isinstance(value, (dict, list)):
+            return self._parse_terminal(path[-1], value)
+
+        root_slot = [None]
+        # (slots, index in slots, path, value, parent_merge_policy)
+        stack = [(root_slot, 0, path, value, MergePolicy())]
+        visited = []
+        while stack:
+            slots, index, path, value, parent_merge_policy = stack.pop()
+            if isinstance(value, dict):
+                # dict marks are popped by key, so items are visited only once
+                mark_list = ScopeParser.parse_from_dict(value)
+                items = value.items()
+            else:
+                # the index of an item is the one after removing the marks
+                mark_list = ScopeParser.parse_from_list(value)
+                items = enumerate(value)
+
+            # containers are deferred, as all marks of this level affect them
+            next_merge_policy = parent_merge_policy.derive(mark_list)
+            children = []
+            for key, item in items:
+                if isinstance(item, (dict, list)):
+                    child_path = path + (key,)
+                    stack.append(
+                        (children, len(children), child_path, item, next_merge_policy)
+                    )
+                    children.append(None)
+                else:
+                    children.append(self._parse_terminal(key, item))
+            node_args = (path, parent_merge_policy, mark_list, children)
+            visited.append((slots, index, node_args))
+
+        for slots, index, node_args in reversed(visited):
+            slots[index] = self._make_container_node(*node_args)
+        return root_slot[0]
+
+    def _parse_terminal(self, key: str | int, value: Any) -> MergePolicyNode:
+        if is_token_string(value):
             token_list = TokenParser.parse(value)
             process_result = TokenProcessor.process(token_list)
-            merge_policy = process_result.merge_policy
-            node = MergePolicyNode(path[-1], merge_policy)
-            return node
-        else:
-            node = MergePolicyNode(path[-1], MergePolicy())
-            return node
+            return MergePolicyNode(key, process_result.merge_policy)
+        return MergePolicyNode(key, _default_merge_policy)
+
+    def _make_container_node(
+        self,
+        path: TreePath,
+        parent_merge_policy: MergePolicy,
+        mark_list: list[tuple],
+        children: list[MergePolicyNode],
+    ) -> MergePolicyNode:
+        level_mark_list = []
+        if len(path) > 1:
+            level_mark_list = self._backtrack_merge_policies(children)
+        current_merge_policy = self._merge_policy_override_process(
+            parent_merge_policy, level_mark_list + mark_list, path
+        )
+        node = MergePolicyNode(
+            path[-1],
+            current_merge_policy,
+            children,
+            mark_list=tuple(mark_list),
+            level_mark_list=tuple(level_mark_list),
+            marked_below=any(
+                child.mark_list or child.marked_below for child in children
+            ),
+        )
+        return node
 
     def _merge_policy_override_process(
         self, parent_merge_policy, mark_list, path
-    ) -> tuple(MergePolicy, MergePolicy):
-        # will be used in this level (contain non-inheritable path-specific policy)
-        current_merge_policy = MergePolicy().inherit_load(parent_merge_policy)
-        current_merge_policy.load_from_path_map(path)
-        current_merge_policy.load_from_mark_list(mark_list)
-        # will be used as inheritance base for subsequent levels
-        next_merge_policy = MergePolicy().inherit_load(parent_merge_policy)
-        next_merge_policy.load_from_mark_list(mark_list)
-        return current_merge_policy, next_merge_policy
-
-    def _backtrack_merge_policies(self, path: TreePath):
+    ) -> MergePolicy:
+        """
+        Return the merge policy used in this level, which contains
+        non-inheritable path-specific policy. The one used as inheritance base
+        for subsequent levels is parent_merge_policy.derive(mark_list).
+        """
+        current_merge_policy = parent_merge_policy.load_from_path_map(path)
+        return current_merge_policy.derive(mark_list)
+
+    def _backtrack_merge_policies(self, children: list[MergePolicyNode]) -> list:
         """
         When a merge=true is found after a merge=false, all ancestors which
         have merge=false must be turned into merge=true, until
         (and excluding) root.
+
+        Return the level-only marks of a node with such @children. They are
+        not inherited, so siblings of the merge=true node keep their policy,
+        and they are loaded before the node's own marks, so an explicit
+        merge=false still wins.
         """
+        for child in children:
+            if ("merge", True) in child.mark_list or child.level_mark_list:
+                return [("merge", True)]
+        return []
+
+
+# shared by the nodes of terminals, as policies are immutable
+_default_merge_policy = MergePolicy()
 
 
 def is_token_string(value: Any):
@@ -106,6 +156,10 @@ class LazyMap:
 GraphEdge = tuple[str | int, list[str | int]]
 
 
+class LazyGraphCycleError(ValueError):
+    """Raised when lazy values depend on each other cyclically."""
+
+
 class LazyGraph:
     """
     given paths a, b, c and dependencies:
@@ -118,19 +172,147 @@ class LazyGraph:
         b: [c],
         c: []
     }
+
+    Paths are the ones of the lazy values, and dependencies may be any path of
+    the tree (a lazy value depending on a container depends on everything
+    inside it). Reverse edges and prefix indexes are kept, so the lazy values
+    affected by a changed path are found without scanning the graph.
     """
 
     def __init__(self):
-        self._graph = {}
+        self._graph: dict[TreePath, tuple[TreePath, ...]] = {}
+        # {dependency -> lazy paths depending on it}
+        self._dependents: dict[TreePath, set[TreePath]] = {}
+        # {proper prefix of a dependency -> dependencies under it}
+        self._dependency_prefixes: dict[TreePath, set[TreePath]] = {}
+        # {prefix of a lazy path (including itself) -> lazy paths under it}
+        self._path_prefixes: dict[TreePath, set[TreePath]] = {}
 
     def add(self, path: TreePath, *dependencies: list[TreePath]):
+        if path in self._graph:
+            self.remove(path)
+        dependencies = tuple(tuple(dependency) for dependency in dependencies)
         self._graph[path] = dependencies
+        for i in range(len(path) + 1):
+            self._path_prefixes.setdefault(path[:i], set()).add(path)
+        for dependency in dependencies:
+            dependents = self._dependents.setdefault(dependency, set())
+            if not dependents:
+                for i in range(len(dependency)):
+                    prefix = dependency[:i]
+                    self._dependency_prefixes.setdefault(prefix, set()).add(dependency)
+            dependents.add(path)
 
     def remove(self, path: TreePath):
-        del self._graph[path]
+        dependencies = self._graph.pop(path)
+        for i in range(len(path) + 1):
+            _discard(self._path_prefixes, path[:i], path)
+        for dependency in dependencies:
+            _discard(self._dependents, dependency, path)
+            if dependency not in self._dependents:
+                for i in range(len(dependency)):
+                    _discard(self._dependency_prefixes, dependency[:i], dependency)
+
+    def dependencies(self, path: TreePath) -> tuple[TreePath, ...]:
+        return self._graph[path]
+
+    def paths_under(self, path: TreePath) -> set[TreePath]:
+        """Return the lazy paths at or under @path."""
+        return set(self._path_prefixes.get(path, ()))
+
+    def dependents(self, path: TreePath) -> set[TreePath]:
+        """Return the lazy values depending directly on @path (or on its parents)."""
+        dependents = set()
+        for i in range(len(path) + 1):
+            dependents.update(self._dependents.get(path[:i], ()))
+        for dependency in self._dependency_prefixes.get(path, ()):
+            dependents.update(self._dependents[dependency])
+        return dependents
+
+    def affected_by(self, changed_paths: Iterable[TreePath]) -> set[TreePath]:
+        """
+        Return the lazy values which depend, directly or through other lazy
+        values, on any of the @changed_paths.
+        """
+        affected = set()
+        queue = list(changed_paths)
+        while queue:
+            for path in self.dependents(queue.pop()):
+                if path not in affected:
+                    affected.add(path)
+                    queue.append(path)
+        return affected
+
+    def topological_order(self, paths: Iterable[TreePath] = None) -> list[TreePath]:
+        """
+        Return the lazy @paths (all, by default) ordered so dependencies come
+        before their dependents. Ties keep the order the paths were added.
 
-    def iterate(self):
-        ...
+        Raise LazyGraphCycleError if they have cyclic dependencies.
+        """
+        nodes = self._graph.keys() if paths is None else set(paths)
+        ordered_nodes = [path for path in self._graph if path in nodes]
+        predecessors_count = {}
+        successors: dict[TreePath, list[TreePath]] = {}
+        for path in ordered_nodes:
+            predecessors = self._lazy_predecessors(path) & nodes
+            predecessors_count[path] = len(predecessors)
+            for predecessor in predecessors:
+                successors.setdefault(predecessor, []).append(path)
+
+        # ready nodes are taken by their position in ordered_nodes
+        position = {path: i for i, path in enumerate(ordered_nodes)}
+        ready = [i for path, i in position.items() if not predecessors_count[path]]
+        order = []
+        while ready:
+            path = ordered_nodes[heapq.heappop(ready)]
+            order.append(path)
+            for successor in successors.get(path, ()):
+                predecessors_count[successor] -= 1
+                if not predecessors_count[successor]:
+                    heapq.heappush(ready, position[successor])
+
+        if len(order) != len(ordered_nodes):
+            cyclic = [path for path in ordered_nodes if predecessors_count[path]]
+            raise LazyGraphCycleError(f"Cyclic lazy value dependencies in {cyclic}")
+        return order
+
+    def iterate(self) -> Iterator[TreePath]:
+        """Yield all lazy paths in dependency order."""
+        yield from self.topological_order()
+
+    def _lazy_predecessors(self, path: TreePath) -> set[TreePath]:
+        """
+        Return the lazy values which @path depends on (inside or above them).
+        Depending on a container which has @path inside is not a cycle.
+        """
+        predecessors = set()
+        for dependency in self._graph[path]:
+            predecessors.update(self._path_prefixes.get(dependency, ()))
+            for i in range(len(dependency)):
+                if dependency[:i] in self._graph:
+                    predecessors.add(dependency[:i])
+        if path not in self._graph[path]:
+            predecessors.discard(path)
+        return predecessors
+
+    def __contains__(self, path: TreePath):
+        return path in self._graph
+
+    def __len__(self):
+        return len(self._graph)
+
+
+def _discard(index: dict[Any, set], key: Any, value: Any):
+    values = index.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del index[key]
+
+
+# first char of the strings which may be list marks ("dynaconf_" or "@")
+_MARK_PREFIXES = frozenset("dD@")
 
 
 class ScopeParser:
@@ -170,30 +352,58 @@ class ScopeParser:
         """
         Parse and pop/mutates(when applicable) dynaconf marks from a list and
         return list of(mark_attr, new_value) tuples.
+
+        The list is filtered in a single pass, and only rebuilt if it has marks.
         """
         mark_list = []
-        # reverse loop
-        for i in range(len(list_data) - 1, 0, -1):
-            if not isinstance(list_data[i], str):
-                continue
-
-            value = list_data[i].lower()
-            if value in ("dynaconf_merge",):
-                list_data.pop(i)
-                mark_list.append(("merge", True))
-            elif value in ("dynaconf_merge=false",):
-                list_data.pop(i)
-                mark_list.append(("merge", False))
-            elif value in ("dynaconf_merge_unique",):
-                list_data.pop(i)
-                mark_list.append(("merge_unique", True))
-            elif value.startswith("dynaconf_id_key="):
-                list_data.pop(i)
-                mark_list.append(("dict_id_key", value[value.find("=") + 1 :]))
-            elif value in ("@empty"):
-                list_data[i] = None
+        items = None
+        parse_list_mark = ScopeParser.parse_list_mark
+        for i, item in enumerate(list_data):
+            if isinstance(item, str) and item[:1] in _MARK_PREFIXES:
+                mark = parse_list_mark(item)
+                if mark is not None:
+                    if items is None:
+                        items = list_data[:i]
+                    if mark is ScopeParser.EMPTY:
+                        items.append(None)
+                    else:
+                        mark_list.append(mark)
+                    continue
+            if items is not None:
+                items.append(item)
+
+        if items is not None:
+            list_data[:] = items
+        # reversed, so the first mark of the list wins when loaded
+        mark_list.reverse()
         return mark_list
 
+    # placeholder for an empty list item (@empty)
+    EMPTY = ("@empty", None)
+
+    # {lowercase list mark: (mark_attr, new_value)}
+    LIST_MARKS = {
+        "dynaconf_merge": ("merge", True),
+        "dynaconf_merge=false": ("merge", False),
+        "dynaconf_merge_unique": ("merge_unique", True),
+        "@empty": EMPTY,
+    }
+
+    @staticmethod
+    def parse_list_mark(item: str) -> tuple | None:
+        """
+        Return the (mark_attr, new_value) tuple of a list mark, ScopeParser.EMPTY
+        for the empty placeholder or None for non-mark strings.
+        """
+        if item[:1] not in _MARK_PREFIXES:
+            return None
+        value = item.lower()
+        mark = ScopeParser.LIST_MARKS.get(value)
+        if mark is None and value.startswith("dynaconf_id_key="):
+            # the key name keeps its case
+            return ("dict_id_key", item[len("dynaconf_id_key=") :])
+        return mark
+
     @staticmethod
     def pop_from_dict(dict_data: dict):
         ...
@@ -208,31 +418,30 @@ class TokenParser:
         Example:
             >> > TokenParser.parses("@foo @bar spam")
             (('foo', ''), ('bar', 'spam')
+
+        Token strings repeat a lot, so parsed strings are cached (the returned
+        list is a copy, safe to mutate).
         """
-        token_word = []
-        token_arg = []
-        token_list = []
-        capture_mode = "token_word"
-        for i, char in enumerate(string[1:]):
-            if capture_mode == "token_word":
-                if char == " ":
-                    capture_mode = "token_arg"
-                    continue
-                else:
-                    token_word.append(char)
-            elif capture_mode == "token_arg":
-                if char == "@":
-                    capture_mode = "token_word"
-                    token_list.append(("".join(token_word), "".join(token_arg[:-1])))
-                    token_word.clear()
-                    token_arg.clear()
-                else:
-                    token_arg.append(char)
-        token_list.append(("".join(token_word), "".join(token_arg)))
-        token_word.clear()
-        token_arg.clear()
-        token_list = token_list
-        return token_list
+        return list(_parse_tokens(string))
+
+
+@lru_cache(maxsize=1024)
+def _parse_tokens(string: str) -> tuple[tuple[str, str], ...]:
+    # a token word ends at a space, and its argument right before the next "@"
+    token_list = []
+    start = 1
+    while True:
+        space = string.find(" ", start)
+        if space == -1:
+            token_list.append((string[start:], ""))
+            break
+        at = string.find("@", space + 1)
+        if at == -1:
+            token_list.append((string[start:space], string[space + 1 :]))
+            break
+        token_list.append((string[start:space], string[space + 1 : at - 1]))
+        start = at + 1
+    return tuple(token_list)
 
 
 class TokenProcessor:
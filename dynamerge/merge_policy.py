@@ -1,17 +1,20 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Iterable, Iterator
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MergePolicy:
     """
     Responsible for storing merge policies and directives, which control the
     behavior of merging process in various scopes.
 
-    This object is intended to be "inherited" via duplication for each tree-level
-    of the merging process, thus representing what policies should apply for a
-    particular level.
+    This object is immutable, so it can be shared between tree-levels of the
+    merging process: a level only gets a different instance when a mark or a
+    path-policy actually changes something (see MergePolicy.derive).
+    It is slotted, as policy nodes keep one instance per node.
     """
 
     merge: bool = False
@@ -20,59 +23,270 @@ class MergePolicy:
 
     def inherit_load(self, parent_merge_policy: MergePolicy) -> MergePolicy:
         """
-        Copy parent MergePolicy to self.
+        Return a copy of self with parent MergePolicy loaded.
         Bypasses None values to allow partial override.
         """
+        changes = {}
         if parent_merge_policy.merge is not None:
-            self.merge = parent_merge_policy.merge
+            changes["merge"] = parent_merge_policy.merge
         if parent_merge_policy.merge_unique is not None:
-            self.merge_unique = parent_merge_policy.merge_unique
+            changes["merge_unique"] = parent_merge_policy.merge_unique
         if parent_merge_policy.dict_id_key is not None:
-            self.dict_id_key = parent_merge_policy.dict_id_key
-        return self
+            changes["dict_id_key"] = parent_merge_policy.dict_id_key
+        return replace(self, **changes)
 
-    def load_from_mark_list(self, mark_list: list[tuple]):
+    def load_from_mark_list(self, mark_list: list[tuple]) -> MergePolicy:
         """
-        Load merge policies form mark list, where each list element is
-        a tuple (mark_attr, new_value)
+        Return a copy of self with policies loaded from mark list, where each
+        list element is a tuple (mark_attr, new_value)
         """
-        for mark_attr, new_value in mark_list:
-            try:
-                setattr(self, mark_attr, new_value)
-            except AttributeError:
-                print("Invalid parsed marker")
-                raise
-
-    def load_from_path_map(self, path):
+        try:
+            return replace(self, **dict(mark_list))
+        except TypeError:
+            print("Invalid parsed marker")
+            raise
+
+    def load_from_path_map(self, path) -> MergePolicy:
         """
-        Load merge policy from a map of path:merge_policy
+        Return a copy of self with policy loaded from a map of path:merge_policy
         """
-        map = {
-            ("root",): MergePolicy(merge=False),
-        }
-        try:
-            self.inherit_load(map[path])
-        except KeyError:
-            ...
-        return self
+        path_policy = _path_policies.get(path)
+        if path_policy is None:
+            return self
+        return self.inherit_load(path_policy)
+
+    def derive(
+        self, mark_list: list[tuple] = (), path_policy: MergePolicy = None
+    ) -> MergePolicy:
+        """
+        Return the policy for a child scope, loading @path_policy and then
+        @mark_list on top of self.
+
+        Without marks or path-policy, self is returned as is. Otherwise the
+        result is cached, so equal derivations share the same instance.
+        """
+        if not mark_list and path_policy is None:
+            return self
+        return _derive_policy(self, tuple(mark_list), path_policy)
+
+
+@lru_cache(maxsize=1024)
+def _derive_policy(
+    merge_policy: MergePolicy, mark_list: tuple, path_policy: MergePolicy | None
+) -> MergePolicy:
+    if path_policy is not None:
+        merge_policy = merge_policy.inherit_load(path_policy)
+    return merge_policy.load_from_mark_list(mark_list)
+
+
+class PathPolicyTrie:
+    """
+    Compiled matcher of path-specific merge policies.
+
+    Path patterns are tuples whose elements are either:
+        - a key: matches that key only. E.g, "root", 0
+        - PathPolicyTrie.WILDCARD ("*"): matches any key
+        - a type: matches keys of that type. E.g, int matches any list index
+
+    E.g: PathPolicyTrie({("root", "*", "databases"): MergePolicy(merge=True)})
+
+    The trie is meant to be descended alongside the data with a cursor (the
+    tuple of trie nodes matching the current path), so each level costs one
+    lookup per matching node instead of a lookup of the full path. When
+    patterns conflict, the most specific wins: keys, then types, then wildcards,
+    compared level by level from the start of the path.
+    """
+
+    WILDCARD = "*"
+    EMPTY_CURSOR: tuple = ()
+
+    class _Node:
+        __slots__ = ("children", "type_children", "wildcard", "policy")
+
+        def __init__(self):
+            self.children: dict = {}
+            self.type_children: dict[type, PathPolicyTrie._Node] = {}
+            self.wildcard: PathPolicyTrie._Node | None = None
+            self.policy: MergePolicy | None = None
+
+    def __init__(self, path_policies: dict[tuple, MergePolicy] | None = None):
+        self._root = PathPolicyTrie._Node()
+        for path, merge_policy in (path_policies or {}).items():
+            self.add(path, merge_policy)
+
+    def add(self, path: tuple, merge_policy: MergePolicy):
+        """Register @merge_policy for the @path pattern (overrides an equal one)."""
+        node = self._root
+        for key in path:
+            if key == PathPolicyTrie.WILDCARD:
+                if node.wildcard is None:
+                    node.wildcard = PathPolicyTrie._Node()
+                node = node.wildcard
+            elif isinstance(key, type):
+                node = node.type_children.setdefault(key, PathPolicyTrie._Node())
+            else:
+                node = node.children.setdefault(key, PathPolicyTrie._Node())
+        node.policy = merge_policy
+
+    def root_cursor(self) -> tuple:
+        """Return the cursor of the empty path, where descending starts."""
+        return (self._root,)
+
+    @staticmethod
+    def descend(cursor: tuple, key) -> tuple:
+        """
+        Return the cursor of the child @key of the @cursor path.
+        Once no pattern matches, the empty cursor is returned (and kept) cheaply.
+        """
+        if not cursor:
+            return cursor
+        next_cursor = []
+        for node in cursor:
+            child = node.children.get(key)
+            if child is not None:
+                next_cursor.append(child)
+            for key_type, child in node.type_children.items():
+                if isinstance(key, key_type):
+                    next_cursor.append(child)
+            if node.wildcard is not None:
+                next_cursor.append(node.wildcard)
+        return tuple(next_cursor)
+
+    @staticmethod
+    def policy(cursor: tuple) -> MergePolicy | None:
+        """Return the most specific policy of the @cursor path, if any."""
+        for node in cursor:
+            if node.policy is not None:
+                return node.policy
+        return None
+
+    @staticmethod
+    def has_descendants(cursor: tuple) -> bool:
+        """Return True if any pattern may match a path under the @cursor path."""
+        for node in cursor:
+            if node.children or node.type_children or node.wildcard is not None:
+                return True
+        return False
+
+    def cursor(self, path: tuple) -> tuple:
+        """Return the cursor of the full @path."""
+        cursor = self.root_cursor()
+        for key in path:
+            cursor = PathPolicyTrie.descend(cursor, key)
+            if not cursor:
+                break
+        return cursor
+
+    def get(self, path: tuple) -> MergePolicy | None:
+        """Return the policy for the full @path, if any pattern matches it."""
+        return PathPolicyTrie.policy(self.cursor(path))
+
+
+# used by MergePolicy.load_from_path_map
+_path_policies = PathPolicyTrie(
+    {
+        ("root",): MergePolicy(merge=False),
+    }
+)
 
 
-@dataclass
 class MergePolicyNode:
-    """Represent a merge policy at each node of a tree-like structure."""
+    """
+    Represent a merge policy at each node of a tree-like structure.
+
+    Children are indexed by key (in insertion order), so looking up a path
+    costs one dict lookup per level.
+
+    mark_list:
+        Marks parsed from this node (inherited by its descendents).
+    level_mark_list:
+        Marks which apply only for this node (e.g, from backtracking).
+    marked_below:
+        Whether marks were parsed from any descendent of this node.
+    """
 
-    key: str
-    merge_policy: MergePolicy
-    children: list = field(default_factory=list)
+    __slots__ = (
+        "key",
+        "merge_policy",
+        "mark_list",
+        "level_mark_list",
+        "marked_below",
+        "_children",
+    )
+
+    def __init__(
+        self,
+        key: str | int,
+        merge_policy: MergePolicy,
+        children: Iterable[MergePolicyNode] = (),
+        mark_list: tuple = (),
+        level_mark_list: tuple = (),
+        marked_below: bool = False,
+    ):
+        self.key = key
+        self.merge_policy = merge_policy
+        self.mark_list = mark_list
+        self.level_mark_list = level_mark_list
+        self.marked_below = marked_below
+        self._children: dict[str | int, MergePolicyNode] = {}
+        for child in children:
+            self.add_child(child)
+
+    @property
+    def children(self) -> list[MergePolicyNode]:
+        return list(self._children.values())
 
     def add_child(self, child: MergePolicyNode):
         if not isinstance(child, MergePolicyNode):
             raise TypeError()
 
-        self.children.append(child)
+        self._children[child.key] = child
+
+    def get(self, key, default=None) -> MergePolicyNode | None:
+        return self._children.get(key, default)
+
+    def get_node(self, path: tuple) -> MergePolicyNode:
+        """
+        Return the node at @path, which starts with this node's key.
+        E.g: tree.get_node(("root", "a", 0))
+        """
+        if not path or path[0] != self.key:
+            raise KeyError("Path does not start at this node: ", path)
+        node = self
+        for key in path[1:]:
+            node = node[key]
+        return node
+
+    def get_policy(self, path: tuple) -> MergePolicy:
+        """Return the merge policy of the node at @path (see get_node)."""
+        return self.get_node(path).merge_policy
 
     def __getitem__(self, key):
         try:
-            return [node for node in self.children if node.key == key][0]
-        except IndexError:
+            return self._children[key]
+        except KeyError:
             raise KeyError("Key does not exist in children: ", key)
+
+    def __iter__(self) -> Iterator[MergePolicyNode]:
+        return iter(self._children.values())
+
+    def __len__(self):
+        return len(self._children)
+
+    def __eq__(self, other):
+        if not isinstance(other, MergePolicyNode):
+            return NotImplemented
+        return (
+            self.key == other.key
+            and self.merge_policy == other.merge_policy
+            and self.mark_list == other.mark_list
+            and self.level_mark_list == other.level_mark_list
+            and self.marked_below == other.marked_below
+            and self.children == other.children
+        )
+
+    def __repr__(self):
+        return (
+            f"MergePolicyNode(key={self.key!r}, merge_policy={self.merge_policy!r}, "
+            f"children={len(self._children)})"
+        )
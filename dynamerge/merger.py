@@ -2,13 +2,19 @@
 Module responsible for merging two structures.
 """
 from __future__ import annotations
-from dynamerge.differ import KeyDiffer, KeyDiff
-from dynamerge.merge_policy import MergePolicy
-from dynamerge.marks import ScopeParser
-from typing import Any, TypeAlias, Callable
+from dynamerge.differ import KeyDiffer, KeyDiff, PseudoIdStrategies
+from dynamerge.merge_policy import MergePolicy, MergePolicyNode, PathPolicyTrie
+from dynamerge.marks import MarkupParser, ScopeParser
+from dynamerge.fingerprint import Fingerprinter
+from typing import Any, TypeAlias, Callable, Iterable, Iterator
 from icecream import ic
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import partial
+from itertools import product
+from array import array
+from operator import attrgetter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import sys
 
 # typing
 TreePath: TypeAlias = tuple
@@ -23,12 +29,16 @@ def main():
 
 
 def subscribe_new(parent, diff: KeyDiff, **kwargs):
-    parent[diff.real_key_pair[0]] = diff.diff_pair[1]
+    parent[diff.old_key] = diff.new
     return parent
 
 
 def append_new(parent: list, diff: KeyDiff, **kwargs):
-    parent.append(diff.diff_pair[1])
+    # an old None item (an @empty placeholder) is filled in place
+    if diff.old_key is not None:
+        parent[diff.old_key] = diff.new
+    else:
+        parent.append(diff.new)
     return parent
 
 
@@ -38,7 +48,7 @@ def inset_new_at(parent: list, diff: KeyDiff, **kwargs):
     except KeyError:
         raise
 
-    parent.insert(insert_index, diff.diff_pair[1])
+    parent.insert(insert_index, diff.new)
     return parent
 
 
@@ -48,7 +58,7 @@ def keep_old(parent, key_diff: KeyDiff, **kwargs):
 
 def use_merge(parent, diff: KeyDiff, merge_policy: MergePolicy, **kwargs):
     merge_fn = Merger.merge_containers
-    parent[diff.real_key_pair[0]] = merge_fn(*diff.diff_pair, merge_policy, **kwargs)
+    parent[diff.old_key] = merge_fn(diff.old, diff.new, merge_policy, **kwargs)
     return parent
 
 
@@ -56,53 +66,833 @@ class Merger:
     """Namespace for merge process"""
 
     @staticmethod
-    def merge(old: dict, new: dict):
-        """Public merge entrypoint"""
-        merge_result = MergeResult()
+    def merge(
+        old: dict,
+        new: dict,
+        skip_identical: bool = False,
+        engine: str = "recursive",
+        record_patch: bool = True,
+        preparse: bool = False,
+        policy_tree: MergePolicyNode | None = None,
+        parallel: bool = False,
+        parallel_threshold: int = 10_000,
+        executor: Executor | None = None,
+        persistent: bool = False,
+    ):
+        """
+        Public merge entrypoint
+
+        Args:
+            record_patch: record the applied patches in MergeResult.tree_patch.
+            skip_identical: skip the merge of containers pairs which are equal,
+                as in dynaconf's object_merge. See MergeResult.skipped_node_count.
+            engine: "recursive" (Merger.merge_containers) or "iterative"
+                (Merger.merge_containers_iterative). Both produce the same results.
+            preparse: parse (and strip) the marks of @new with MarkupParser before
+                merging, so the merger doesn't scan containers for marks. Unlike
+                the default path, it strips the marks of replaced subtrees too,
+                and merges the ancestors of a merge=true mark (backtracking).
+            policy_tree: the MergePolicyNode tree of an already parsed @new.
+            parallel: merge the sections (children of root-level containers) with
+                at least @parallel_threshold nodes in a process pool (or a thread
+                pool, on free-threaded builds). See Merger.merge_containers_parallel.
+            executor: the pool used for a @parallel merge. By default, one is
+                created (only if needed) and shut down when the merge is done.
+            persistent: don't mutate @old. The merged tree (MergeResult.tree) is a
+                new one, where only the containers along changed paths are copied
+                and unchanged subtrees are shared with @old (and @new).
+        """
+        try:
+            merge_fn = Merger.engines[engine]
+        except KeyError:
+            raise ValueError(f"Unknown merge engine: {engine!r}")
+
+        merge_result = MergeResult(tree_patch=TreePatch() if record_patch else None)
         merge_policy = MergePolicy()
-        Merger.merge_containers(
-            old, new, merge_policy=merge_policy, merge_result=merge_result
+        if preparse and policy_tree is None:
+            policy_tree = MarkupParser(new).parse_tree().merge_policy_tree
+        if policy_tree is not None:
+            merge_policy = merge_policy.derive(policy_tree.mark_list)
+
+        context = MergeContext(
+            merge_result, skip_identical=skip_identical, persistent=persistent
         )
+        if parallel:
+            if persistent:
+                raise ValueError("Parallel merges can't be persistent")
+            context.parallel = ParallelOptions(
+                engine, parallel_threshold, executor=executor
+            )
+            merge_fn = Merger.merge_containers_parallel
+
+        try:
+            merge_result.tree = merge_fn(
+                old,
+                new,
+                merge_policy=merge_policy,
+                context=context,
+                policy_node=policy_tree,
+                path_cursor=PatcherMap.path_policies.root_cursor(),
+            )
+        finally:
+            if context.parallel is not None:
+                context.parallel.shutdown()
         return merge_result
 
+    @staticmethod
+    def merge_many(
+        base: dict, layers: Iterable[dict], record_patch: bool = True
+    ) -> MergeResult:
+        """
+        Merge each of @layers into @base, in order, with the same resulting tree
+        as calling Merger.merge(base, layer) for each one.
+
+        The layers are folded per key, so each path is visited once instead of
+        once per layer: a replacing layer drops the merges of the previous
+        ones, and the remaining merges are done in a single recursion. Lists
+        are still merged one layer at a time.
+
+        The tree_patch has the net patch of all layers (one entry per path), and
+        merge_operation_count the number of patchers resolved. The merged tree
+        (MergeResult.tree) is @base.
+        """
+        merge_result = MergeResult(tree_patch=TreePatch() if record_patch else None)
+        context = MergeContext(merge_result)
+        layers = [(layer, MergePolicy()) for layer in layers]
+        Merger._merge_layers(
+            base,
+            layers,
+            LazyPath.root(),
+            PatcherMap.path_policies.root_cursor(),
+            context,
+        )
+        merge_result.tree = base
+        return merge_result
+
+    @staticmethod
+    def _merge_layers(
+        old: dict,
+        layers: list[tuple[dict, MergePolicy]],
+        parent_path: LazyPath,
+        path_cursor: tuple,
+        context: MergeContext,
+    ):
+        """
+        Fold the (new, merge_policy) @layers into @old, key by key.
+
+        The patcher of each layer is resolved against the value the previous
+        layers left (only its type matters), as in a sequential merge.
+        """
+        # union of keys, in the order a sequential merge would add them
+        keys = dict.fromkeys(old)
+        for new, _ in layers:
+            keys.update(dict.fromkeys(new))
+
+        tree_patch = context.merge_result.tree_patch
+        for key in keys:
+            exists = key in old
+            value = old.get(key)
+            original_value = value
+            replaced = False
+            pending = []  # (new, merge_policy, pseudo_id_strategy) to merge
+            this_path = None
+            for new, merge_policy in layers:
+                if not exists and key not in new:
+                    continue
+                diff = KeyDiff(key, value, new.get(key), key, key)
+                resolved = Merger._resolve_diff(
+                    old, diff, merge_policy, parent_path, context, None, path_cursor
+                )
+                (
+                    action_fn,
+                    child_merge_policy,
+                    this_path,
+                    _,
+                    child_cursor,
+                    child_strategy,
+                ) = resolved
+                context.merge_result.merge_operation_count += 1
+                if action_fn is use_merge:
+                    pending.append((diff.new, child_merge_policy, child_strategy))
+                elif action_fn is subscribe_new:
+                    value, exists, replaced = diff.new, True, True
+                    pending = []
+                elif action_fn is not keep_old:
+                    # unknown patcher: apply the fold so far, then the patcher
+                    if exists:
+                        old[key] = value
+                    Merger._merge_pending(
+                        value, pending, this_path, child_cursor, context
+                    )
+                    pending = []
+                    action_fn(
+                        old,
+                        diff,
+                        merge_policy=child_merge_policy,
+                        parent_path=this_path,
+                        context=context,
+                        path_cursor=child_cursor,
+                        pseudo_id_strategy=child_strategy,
+                    )
+                    exists, value, replaced = key in old, old.get(key), True
+
+            if this_path is None:
+                continue
+            if replaced and exists:
+                old[key] = value
+
+            if tree_patch is not None:
+                if pending:
+                    op = TreePatch.MERGED
+                elif not replaced:
+                    op = TreePatch.KEPT
+                elif original_value is None:
+                    op = TreePatch.ADDED
+                else:
+                    op = TreePatch.REPLACED
+                tree_patch.append(this_path, op)
+            Merger._merge_pending(value, pending, this_path, child_cursor, context)
+
+    @staticmethod
+    def _merge_pending(
+        value: dict | list,
+        pending: list[tuple[dict | list, MergePolicy, Callable | None]],
+        path: LazyPath,
+        path_cursor: tuple,
+        context: MergeContext,
+    ):
+        if not pending:
+            return
+        if isinstance(value, dict) and all(type(new) is dict for new, _, _ in pending):
+            layers = [(new, merge_policy) for new, merge_policy, _ in pending]
+            Merger._merge_layers(value, layers, path, path_cursor, context)
+            return
+        for new, merge_policy, pseudo_id_strategy in pending:
+            Merger.merge_containers(
+                value,
+                new,
+                merge_policy,
+                path,
+                context=context,
+                path_cursor=path_cursor,
+                pseudo_id_strategy=pseudo_id_strategy,
+            )
+
     @staticmethod
     def merge_containers(
         old: dict | list,
         new: dict | list,
         merge_policy: MergePolicy = None,
-        parent_path: TreePath = None,
+        parent_path: TreePath | LazyPath = None,
         merge_result: MergeResult = None,
+        context: MergeContext = None,
+        policy_node: MergePolicyNode | None = None,
+        path_cursor: tuple | None = None,
+        pseudo_id_strategy: Callable | None = None,
     ):
+        """
+        Merge @new into @old in-place and return it.
+        If context.persistent, @old is not changed, and a merged copy of it is
+        returned instead (or @old itself, if nothing changed).
+
+        If @policy_node is given, it is the pre-parsed MergePolicyNode of @new,
+        and the marks are taken from it instead of being parsed from the values.
+        @path_cursor is the PatcherMap.path_policies cursor of @parent_path
+        (computed from it when not given). @pseudo_id_strategy is the one of a
+        list @old (see Merger._resolve_diff), chosen by @merge_policy if not given.
+        """
         merge_policy = merge_policy or MergePolicy()
-        parent_path = parent_path or tuple()
+        parent_path = _as_lazy_path(parent_path)
+        context = context or MergeContext(merge_result or MergeResult())
+        if path_cursor is None:
+            path_cursor = PatcherMap.path_policies.cursor(parent_path.to_tuple())
+        if type(old) is list:
+            pseudo_id_strategy = pseudo_id_strategy or PseudoIdStrategies.for_policy(
+                merge_policy
+            )
+            merged = Merger._merge_terminal_lists(
+                old,
+                new,
+                merge_policy,
+                pseudo_id_strategy,
+                parent_path,
+                path_cursor,
+                context,
+            )
+            if merged is not None:
+                return merged
 
-        diff_list = KeyDiffer.diff_container(old, new, merge_policy)
+        diffs = KeyDiffer.iter_container(
+            old,
+            new,
+            merge_policy,
+            pseudo_id_strategy=pseudo_id_strategy,
+            fingerprinter=context.fingerprinter,
+        )
         parent = old  # alias
-        for diff in diff_list:
-            this_path = parent_path + (diff.id_key,)
+        for diff in diffs:
+            resolved = Merger._resolve_diff(
+                parent,
+                diff,
+                merge_policy,
+                parent_path,
+                context,
+                policy_node,
+                path_cursor,
+            )
+            if resolved is None:
+                continue
 
-            # new independent merge policy for each child, bacause each has a different
-            # scope and their policy should not be mixed
-            child_merge_policy = MergePolicy().inherit_load(merge_policy)
+            (
+                action_fn,
+                child_merge_policy,
+                this_path,
+                child_node,
+                child_cursor,
+                child_strategy,
+            ) = resolved
+            Merger._record_patch(context, action_fn, diff, this_path)
+            if context.persistent and action_fn is not keep_old:
+                if action_fn is use_merge:
+                    merged = Merger.merge_containers(
+                        diff.old,
+                        diff.new,
+                        child_merge_policy,
+                        this_path,
+                        context=context,
+                        policy_node=child_node,
+                        path_cursor=child_cursor,
+                        pseudo_id_strategy=child_strategy,
+                    )
+                    if merged is diff.old:
+                        continue
+                    if parent is old:
+                        parent = old.copy()
+                    parent[diff.old_key] = merged
+                    continue
+                if parent is old:
+                    parent = old.copy()
+            action_fn(
+                parent,
+                diff,
+                merge_policy=child_merge_policy,
+                parent_path=this_path,
+                context=context,
+                policy_node=child_node,
+                path_cursor=child_cursor,
+                pseudo_id_strategy=child_strategy,
+            )
+        return parent
+
+    @staticmethod
+    def merge_containers_iterative(
+        old: dict | list,
+        new: dict | list,
+        merge_policy: MergePolicy = None,
+        parent_path: TreePath | LazyPath = None,
+        merge_result: MergeResult = None,
+        context: MergeContext = None,
+        policy_node: MergePolicyNode | None = None,
+        path_cursor: tuple | None = None,
+        pseudo_id_strategy: Callable | None = None,
+    ):
+        """
+        Same as Merger.merge_containers, but walks the trees with an explicit
+        stack of (parent, diffs, merge_policy, parent_path, ...) frames instead of
+        recursing on use_merge, so nesting depth is not bound by the recursion limit.
 
-            # tmp_merge includes path-specific policies (e.g, for /root),
-            # so it is used only for this diff case and it is not passed forward.
-            path_based_policy = PatcherMap.tmp_path_based_policies.get(this_path)
-            tmp_merge_policy = MergePolicy().inherit_load(merge_policy)
-            if path_based_policy:
-                tmp_merge_policy.inherit_load(path_based_policy)
+        Frames keep their (lazy) diffs iterator, so containers are visited in the
+        same order as in the recursive engine. On persistent merges, a frame's
+        container is copied on its first change, and assigned to the parent frame
+        when the frame is done.
+        """
+        merge_policy = merge_policy or MergePolicy()
+        parent_path = _as_lazy_path(parent_path)
+        context = context or MergeContext(merge_result or MergeResult())
 
-            # parse new-value only. Old should never contain markers
-            diff_marks = ScopeParser.parse_container(diff.diff_pair[1])
-            child_merge_policy.load_from_mark_list(diff_marks)
-            tmp_merge_policy.load_from_mark_list(diff_marks)
+        if path_cursor is None:
+            path_cursor = PatcherMap.path_policies.cursor(parent_path.to_tuple())
+        if type(old) is list:
+            pseudo_id_strategy = pseudo_id_strategy or PseudoIdStrategies.for_policy(
+                merge_policy
+            )
+            merged = Merger._merge_terminal_lists(
+                old,
+                new,
+                merge_policy,
+                pseudo_id_strategy,
+                parent_path,
+                path_cursor,
+                context,
+            )
+            if merged is not None:
+                return merged
+        diffs = KeyDiffer.iter_container(
+            old,
+            new,
+            merge_policy,
+            pseudo_id_strategy=pseudo_id_strategy,
+            fingerprinter=context.fingerprinter,
+        )
+        # [original, parent, diffs, merge_policy, parent_path, policy_node,
+        #  path_cursor, key of original in the parent frame]
+        stack = [
+            [old, old, diffs, merge_policy, parent_path, policy_node, path_cursor, None]
+        ]
+        merged = old
+        while stack:
+            frame = stack[-1]
+            original, parent, diffs, merge_policy, parent_path, policy_node = frame[:6]
+            path_cursor = frame[6]
+            for diff in diffs:
+                resolved = Merger._resolve_diff(
+                    parent,
+                    diff,
+                    merge_policy,
+                    parent_path,
+                    context,
+                    policy_node,
+                    path_cursor,
+                )
+                if resolved is None:
+                    continue
+
+                (
+                    action_fn,
+                    child_merge_policy,
+                    this_path,
+                    child_node,
+                    child_cursor,
+                    child_strategy,
+                ) = resolved
+                Merger._record_patch(context, action_fn, diff, this_path)
+                if action_fn is use_merge:
+                    # merging happens in-place (or the copy is assigned on pop)
+                    child_old, child_new = diff.old, diff.new
+                    if type(child_old) is list:
+                        merged_list = Merger._merge_terminal_lists(
+                            child_old,
+                            child_new,
+                            child_merge_policy,
+                            child_strategy,
+                            this_path,
+                            child_cursor,
+                            context,
+                        )
+                        if merged_list is not None:
+                            if merged_list is not child_old:
+                                if parent is original:
+                                    parent = frame[1] = original.copy()
+                                parent[diff.old_key] = merged_list
+                            continue
+                    child_diffs = KeyDiffer.iter_container(
+                        child_old,
+                        child_new,
+                        child_merge_policy,
+                        pseudo_id_strategy=child_strategy,
+                        fingerprinter=context.fingerprinter,
+                    )
+                    stack.append(
+                        [
+                            child_old,
+                            child_old,
+                            child_diffs,
+                            child_merge_policy,
+                            this_path,
+                            child_node,
+                            child_cursor,
+                            diff.old_key,
+                        ]
+                    )
+                    break
 
-            action_fn = PatcherMap.get_patcher(
-                parent, diff, tmp_merge_policy, this_path
+                if context.persistent and action_fn is not keep_old:
+                    if parent is original:
+                        parent = frame[1] = original.copy()
+
+                action_fn(
+                    parent,
+                    diff,
+                    merge_policy=child_merge_policy,
+                    parent_path=this_path,
+                    context=context,
+                    policy_node=child_node,
+                    path_cursor=child_cursor,
+                    pseudo_id_strategy=child_strategy,
+                )
+            else:
+                stack.pop()
+                if parent is original:
+                    continue
+                if not stack:
+                    merged = parent
+                    continue
+                parent_frame = stack[-1]
+                if parent_frame[1] is parent_frame[0]:
+                    parent_frame[1] = parent_frame[0].copy()
+                parent_frame[1][frame[7]] = parent
+        return merged
+
+    @staticmethod
+    def merge_containers_parallel(
+        old: dict | list,
+        new: dict | list,
+        merge_policy: MergePolicy = None,
+        parent_path: TreePath | LazyPath = None,
+        merge_result: MergeResult = None,
+        context: MergeContext = None,
+        policy_node: MergePolicyNode | None = None,
+        path_cursor: tuple | None = None,
+        pseudo_id_strategy: Callable | None = None,
+    ):
+        """
+        Same as Merger.merge_containers, but the sections of the root-level
+        containers (e.g, old["root"]["DATABASES"]) are merged in parallel, using
+        the options in context.parallel (see Merger._merge_sections).
+        """
+        merge_policy = merge_policy or MergePolicy()
+        parent_path = _as_lazy_path(parent_path)
+        context = context or MergeContext(merge_result or MergeResult())
+        context.parallel = context.parallel or ParallelOptions()
+        if path_cursor is None:
+            path_cursor = PatcherMap.path_policies.cursor(parent_path.to_tuple())
+
+        diffs = KeyDiffer.iter_container(
+            old,
+            new,
+            merge_policy,
+            pseudo_id_strategy=pseudo_id_strategy,
+            fingerprinter=context.fingerprinter,
+        )
+        parent = old  # alias
+        for diff in diffs:
+            resolved = Merger._resolve_diff(
+                parent,
+                diff,
+                merge_policy,
+                parent_path,
+                context,
+                policy_node,
+                path_cursor,
+            )
+            if resolved is None:
+                continue
+
+            (
+                action_fn,
+                child_merge_policy,
+                this_path,
+                child_node,
+                child_cursor,
+                child_strategy,
+            ) = resolved
+            Merger._record_patch(context, action_fn, diff, this_path)
+            if action_fn is use_merge:
+                # merging happens in-place, so there is nothing to assign back
+                Merger._merge_sections(
+                    diff.old,
+                    diff.new,
+                    child_merge_policy,
+                    this_path,
+                    context,
+                    child_node,
+                    child_cursor,
+                    child_strategy,
+                )
+                continue
+
+            action_fn(
+                parent,
+                diff,
+                merge_policy=child_merge_policy,
+                parent_path=this_path,
+                context=context,
+                policy_node=child_node,
+                path_cursor=child_cursor,
+                pseudo_id_strategy=child_strategy,
             )
-            action_fn(parent, diff, merge_policy=child_merge_policy)
         return parent
 
+    @staticmethod
+    def _merge_sections(
+        old: dict | list,
+        new: dict | list,
+        merge_policy: MergePolicy,
+        parent_path: LazyPath,
+        context: MergeContext,
+        policy_node: MergePolicyNode | None,
+        path_cursor: tuple,
+        pseudo_id_strategy: Callable | None = None,
+    ):
+        """
+        Merge the dict sections of @new into @old, fanning out the section merges
+        with at least context.parallel.threshold nodes to its executor.
+
+        Sections are independent, so each one is patched into its own MergeResult,
+        and results are spliced back in the diffs order, as in a serial merge.
+        Small merges (less than two large sections) never start a pool.
+        Note that sections merged in a process pool are replaced by a merged copy.
+        """
+        parallel = context.parallel
+        engine_fn = Merger.engines[parallel.engine]
+        if not (isinstance(old, dict) and isinstance(new, dict)):
+            engine_fn(
+                old,
+                new,
+                merge_policy,
+                parent_path,
+                context=context,
+                policy_node=policy_node,
+                path_cursor=path_cursor,
+                pseudo_id_strategy=pseudo_id_strategy,
+            )
+            return
+
+        # diffs are resolved before @old is patched, so they don't see the changes
+        sections = []
+        record_patch = context.merge_result.tree_patch is not None
+        for diff in KeyDiffer.diff_dict(old, new, merge_policy):
+            section_result = MergeResult(
+                tree_patch=TreePatch() if record_patch else None
+            )
+            section_context = MergeContext(
+                section_result, context.skip_identical, context.fingerprinter
+            )
+            resolved = Merger._resolve_diff(
+                old,
+                diff,
+                merge_policy,
+                parent_path,
+                section_context,
+                policy_node,
+                path_cursor,
+            )
+            if resolved is not None:
+                Merger._record_patch(section_context, resolved[0], diff, resolved[2])
+            sections.append((diff, resolved, section_context))
+
+        large_sections = [
+            i
+            for i, (diff, resolved, _) in enumerate(sections)
+            if resolved is not None
+            and resolved[0] is use_merge
+            and _count_nodes(diff.new, parallel.threshold) >= parallel.threshold
+        ]
+        futures = {}
+        if len(large_sections) >= 2:
+            executor = parallel.get_executor()
+            for i in large_sections:
+                diff, resolved, _ = sections[i]
+                _, child_merge_policy, this_path, child_node, _, strategy = resolved
+                futures[i] = executor.submit(
+                    _merge_section,
+                    parallel.engine,
+                    diff.old,
+                    diff.new,
+                    child_merge_policy,
+                    this_path.to_tuple(),
+                    child_node,
+                    context.skip_identical,
+                    record_patch,
+                    strategy,
+                )
+
+        for i, (diff, resolved, section_context) in enumerate(sections):
+            future = futures.get(i)
+            if future is not None:
+                merged, result = future.result()
+                old[diff.old_key] = merged
+                section_context.merge_result.extend(result)
+            elif resolved is not None:
+                (
+                    action_fn,
+                    child_merge_policy,
+                    this_path,
+                    child_node,
+                    child_cursor,
+                    child_strategy,
+                ) = resolved
+                if action_fn is use_merge:
+                    engine_fn(
+                        diff.old,
+                        diff.new,
+                        child_merge_policy,
+                        this_path,
+                        context=section_context,
+                        policy_node=child_node,
+                        path_cursor=child_cursor,
+                        pseudo_id_strategy=child_strategy,
+                    )
+                else:
+                    action_fn(
+                        old,
+                        diff,
+                        merge_policy=child_merge_policy,
+                        parent_path=this_path,
+                        context=section_context,
+                        policy_node=child_node,
+                        path_cursor=child_cursor,
+                        pseudo_id_strategy=child_strategy,
+                    )
+            context.merge_result.extend(section_context.merge_result)
+
+    @staticmethod
+    def _merge_terminal_lists(
+        old: list,
+        new: list,
+        merge_policy: MergePolicy,
+        pseudo_id_strategy: Callable,
+        parent_path: LazyPath,
+        path_cursor: tuple,
+        context: MergeContext,
+    ) -> list | None:
+        """
+        Merge lists of terminals (or None placeholders) in bulk, without diffing
+        them item by item, as the @pseudo_id_strategy would: items are replaced by
+        position with a slice assignment, or new items are extended (only the ones
+        not found in old, for use_content_hash). The result (and patch) is the same
+        as with the default list patchers, resolved with @merge_policy.
+
+        Return the merged list, or None if any item is a container or unhashable,
+        a path policy may apply to the items or the list patchers aren't the
+        default ones.
+        """
+        if not _container_types.isdisjoint(map(type, old)):
+            return None
+        if not _container_types.isdisjoint(map(type, new)):
+            return None
+        if PathPolicyTrie.has_descendants(path_cursor):
+            return None
+        action_map = PatcherMap.compiled_maps[("default",)]
+        try:
+            for old_type, new_type, patcher in _terminal_list_patchers:
+                found = action_map.get_by_types(list, old_type, new_type, merge_policy)
+                if found is not patcher:
+                    return None
+        except KeyError:
+            return None
+
+        bulk_merge = _bulk_list_merges[pseudo_id_strategy]
+        record_patch = context.merge_result.tree_patch is not None
+        try:
+            merged, count, keys, ops = bulk_merge(
+                old, new, context.persistent, record_patch
+            )
+        except TypeError:
+            return None  # unhashable items: their fingerprints are needed
+
+        context.merge_result.merge_operation_count += count
+        if keys is not None:
+            context.merge_result.tree_patch.extend_items(parent_path, keys, ops)
+        return merged
+
+    @staticmethod
+    def _resolve_diff(
+        parent: dict | list,
+        diff: KeyDiff,
+        merge_policy: MergePolicy,
+        parent_path: LazyPath,
+        context: MergeContext,
+        policy_node: MergePolicyNode | None = None,
+        path_cursor: tuple = PathPolicyTrie.EMPTY_CURSOR,
+    ) -> tuple[Callable, MergePolicy, LazyPath, MergePolicyNode | None, tuple] | None:
+        """
+        Return the (patcher, child_merge_policy, path, child_policy_node,
+        child_path_cursor, pseudo_id_strategy) to apply for a @diff, or None if it
+        should be skipped.
+
+        The pseudo_id_strategy of a list is chosen by the policy in effect at its
+        own path (with path policies and level marks), while its items inherit
+        child_merge_policy, as the children of a dict do.
+        """
+        # O(1): the path tuple is only built when read (see LazyPath)
+        this_path = LazyPath(parent_path, diff.id_key)
+
+        child_node = None
+        level_marks = ()
+        marked_below = False
+        if policy_node is None:
+            # parse new-value only. Old should never contain markers
+            diff_marks = ScopeParser.parse_container(diff.new)
+            if diff_marks and context.skip_identical:
+                # a digest memoized by an ancestor still has the popped marks
+                context.fingerprinter.forget(diff.new)
+        else:
+            new_key = diff.new_key
+            if new_key is not None:
+                child_node = policy_node.get(new_key)
+            diff_marks = ()
+            if child_node is not None:
+                diff_marks = child_node.mark_list
+                level_marks = child_node.level_mark_list
+                marked_below = child_node.marked_below
+
+        # each child has a different scope, so their policies should not be
+        # mixed. Policies are immutable: without marks, the parent's is reused
+        child_merge_policy = merge_policy.derive(diff_marks)
+
+        # tmp_merge includes path-specific policies (e.g, for /root),
+        # so it is used only for this diff case and it is not passed forward.
+        child_cursor = PathPolicyTrie.descend(path_cursor, diff.id_key)
+        path_based_policy = PathPolicyTrie.policy(child_cursor)
+        # explicit marks are loaded last, so they win over the level ones
+        tmp_merge_policy = merge_policy.derive(
+            level_marks + tuple(diff_marks), path_based_policy
+        )
+
+        # identical subtrees are kept, as with an `old == new` short-circuit where
+        # the marks of deeper levels (not this one's) make the values differ.
+        # Appending to a list changes it, though, even when both sides are equal.
+        if (
+            context.skip_identical
+            and not marked_below
+            and (
+                type(diff.new) is not list
+                or PseudoIdStrategies.for_policy(tmp_merge_policy)
+                is PseudoIdStrategies.use_index
+            )
+            and context.fingerprinter.identical(diff.old, diff.new)
+        ):
+            context.merge_result.skipped_node_count += 1
+            if context.merge_result.tree_patch is not None:
+                context.merge_result.tree_patch.append(this_path, TreePatch.KEPT)
+            return None
+
+        pseudo_id_strategy = None
+        if type(diff.new) is list:
+            pseudo_id_strategy = PseudoIdStrategies.for_policy(tmp_merge_policy)
+
+        action_fn = PatcherMap.get_patcher(parent, diff, tmp_merge_policy, this_path)
+        return (
+            action_fn,
+            child_merge_policy,
+            this_path,
+            child_node,
+            child_cursor,
+            pseudo_id_strategy,
+        )
+
+    @staticmethod
+    def _record_patch(
+        context: MergeContext, action_fn: Callable, diff: KeyDiff, path: LazyPath
+    ):
+        """Count the patch and record it in the TreePatch, if enabled."""
+        merge_result = context.merge_result
+        merge_result.merge_operation_count += 1
+        if merge_result.tree_patch is None:
+            return
+
+        op = PatcherMap.patch_ops.get(action_fn, TreePatch.REPLACED)
+        if op == TreePatch.REPLACED and diff.old is None:
+            op = TreePatch.ADDED
+        merge_result.tree_patch.append(path, op)
+
+
+Merger.engines = {
+    "recursive": Merger.merge_containers,
+    "iterative": Merger.merge_containers_iterative,
+}
+
 
 @dataclass
 class MergeResult:
@@ -110,10 +900,331 @@ class MergeResult:
 
     tree_patch: TreePatch = None
     merge_operation_count: int = 0
+    skipped_node_count: int = 0
+    tree: dict | list | None = field(default=None, repr=False)
+
+    def extend(self, other: MergeResult):
+        """Append the results of @other, a merge which happened after this one."""
+        self.merge_operation_count += other.merge_operation_count
+        self.skipped_node_count += other.skipped_node_count
+        if self.tree_patch is not None and other.tree_patch is not None:
+            self.tree_patch.extend(other.tree_patch)
+
+
+@dataclass
+class MergeContext:
+    """Store options and state shared by all levels of a merging process."""
+
+    merge_result: MergeResult = field(default_factory=MergeResult)
+    skip_identical: bool = False
+    fingerprinter: Fingerprinter = field(default_factory=Fingerprinter)
+    parallel: ParallelOptions | None = None
+    persistent: bool = False
+
+
+@dataclass
+class ParallelOptions:
+    """
+    Options of a parallel merge (see Merger.merge_containers_parallel).
+
+    Args:
+        engine: the merge engine used for each section
+        threshold: minimum number of nodes of a section to be merged in parallel
+        max_workers: passed to the pool, when it is created by the merge
+        executor: a pool to use. If None, one is created when first needed.
+    """
+
+    engine: str = "recursive"
+    threshold: int = 10_000
+    max_workers: int | None = None
+    executor: Executor | None = None
+    owns_executor: bool = field(default=False, init=False, repr=False)
+
+    def get_executor(self) -> Executor:
+        if self.executor is None:
+            # without the GIL, threads avoid copying the sections between processes
+            pool_cls = ThreadPoolExecutor if _gil_disabled() else ProcessPoolExecutor
+            self.executor = pool_cls(max_workers=self.max_workers)
+            self.owns_executor = True
+        return self.executor
+
+    def shutdown(self):
+        if self.owns_executor:
+            self.executor.shutdown()
+            self.executor = None
+            self.owns_executor = False
+
+
+def _gil_disabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _merge_section(
+    engine: str,
+    old: dict | list,
+    new: dict | list,
+    merge_policy: MergePolicy,
+    path: TreePath,
+    policy_node: MergePolicyNode | None,
+    skip_identical: bool,
+    record_patch: bool,
+    pseudo_id_strategy: Callable | None = None,
+) -> tuple[dict | list, MergeResult]:
+    """Merge a single section, possibly in a worker process."""
+    merge_result = MergeResult(tree_patch=TreePatch() if record_patch else None)
+    context = MergeContext(merge_result, skip_identical=skip_identical)
+    merged = Merger.engines[engine](
+        old,
+        new,
+        merge_policy,
+        path,
+        context=context,
+        policy_node=policy_node,
+        pseudo_id_strategy=pseudo_id_strategy,
+    )
+    return merged, merge_result
+
+
+def _replace_items(
+    old: list, new: list, persistent: bool, record_patch: bool
+) -> tuple[list, int, Iterable | None, list | None]:
+    """Bulk use_index merge of terminal lists: (merged, count, keys, ops)."""
+    common = min(len(old), len(new))
+    keys = ops = None
+    if record_patch:
+        added, replaced, kept = TreePatch.ADDED, TreePatch.REPLACED, TreePatch.KEPT
+        # as the patchers: old None items are filled (append_new), else a new
+        # None keeps the old item
+        ops = [
+            added if old_value is None else kept if new_value is None else replaced
+            for old_value, new_value in zip(old, new)
+        ]
+        if len(new) > common:
+            ops += [added] * (len(new) - common)
+        else:
+            ops += [added if old_value is None else kept for old_value in old[common:]]
+        keys = range(len(ops))
+    count = max(len(old), len(new))
+
+    empty_count = new.count(None)
+    if empty_count == len(new) and len(new) <= len(old):
+        return old, count, keys, ops  # only placeholders: nothing changes
+    merged = old.copy() if persistent else old
+    if empty_count:
+        # placeholders keep the old items
+        for i in range(common):
+            if new[i] is not None:
+                merged[i] = new[i]
+        merged.extend(new[common:])
+    else:
+        merged[: len(new)] = new
+    return merged, count, keys, ops
+
+
+def _append_items(
+    old: list, new: list, persistent: bool, record_patch: bool
+) -> tuple[list, int, Iterable | None, list | None]:
+    """Bulk use_side_index merge of terminal lists: (merged, count, keys, ops)."""
+    keys = ops = None
+    if record_patch:
+        added, kept = TreePatch.ADDED, TreePatch.KEPT
+        keys = [("old", i) for i in range(len(old))]
+        keys += [("new", i) for i in range(len(new))]
+        ops = [added if old_value is None else kept for old_value in old]
+        ops += [added] * len(new)
+    count = len(old) + len(new)
+    if not new:
+        return old, count, keys, ops
+    if persistent:
+        return old + new, count, keys, ops
+    old.extend(new)
+    return old, count, keys, ops
+
+
+def _append_unique_items(
+    old: list, new: list, persistent: bool, record_patch: bool
+) -> tuple[list, int, Iterable | None, list | None]:
+    """
+    Bulk use_content_hash merge of terminal lists: (merged, count, keys, ops).
+    The ids of hashable terminals are the items themselves, so membership is
+    a dict lookup. Matched items are equal, so the old ones are kept.
+    """
+    old_ids = dict.fromkeys(old)
+    new_ids = dict.fromkeys(new)
+    new_only = [item for item in new_ids if item not in old_ids]
+    keys = ops = None
+    if record_patch:
+        added, replaced, kept = TreePatch.ADDED, TreePatch.REPLACED, TreePatch.KEPT
+        keys = list(old_ids)
+        ops = [
+            added if item is None else replaced if item in new_ids else kept
+            for item in keys
+        ]
+        keys += new_only
+        ops += [added] * len(new_only)
+    count = len(old_ids) + len(new_only)
+    if not new_only:
+        return old, count, keys, ops
+    if persistent:
+        return old + new_only, count, keys, ops
+    old.extend(new_only)
+    return old, count, keys, ops
+
+
+_bulk_list_merges = {
+    PseudoIdStrategies.use_index: _replace_items,
+    PseudoIdStrategies.use_side_index: _append_items,
+    PseudoIdStrategies.use_content_hash: _append_unique_items,
+}
+
+
+def _count_nodes(value: Any, limit: int) -> int:
+    """Count the nodes of the @value tree, stopping once @limit is reached."""
+    count = 0
+    stack = [value]
+    while stack and count < limit:
+        value = stack.pop()
+        count += 1
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return count
+
+
+class LazyPath:
+    """
+    A tree path as a linked list of (parent, key) nodes.
+
+    Creating a child path is O(1), and the TreePath tuple is only built
+    (and memoized) when requested with to_tuple, e.g, when a patch is read or
+    an error is reported.
+    """
+
+    __slots__ = ("parent", "key", "_path")
+
+    def __init__(self, parent: LazyPath | None, key: Any):
+        self.parent = parent
+        self.key = key
+        self._path: TreePath | None = None
+
+    @staticmethod
+    def from_tuple(path: TreePath) -> LazyPath:
+        lazy_path = LazyPath(None, None)
+        lazy_path._path = tuple(path)
+        return lazy_path
+
+    @staticmethod
+    def root() -> LazyPath:
+        """Return the empty path."""
+        return LazyPath.from_tuple(())
+
+    def child(self, key: Any) -> LazyPath:
+        return LazyPath(self, key)
+
+    def to_tuple(self) -> TreePath:
+        if self._path is not None:
+            return self._path
+        # collect keys up to the nearest materialized ancestor
+        keys = []
+        node = self
+        while node._path is None:
+            keys.append(node.key)
+            node = node.parent
+        keys.reverse()
+        self._path = node._path + tuple(keys)
+        return self._path
+
+    def __eq__(self, other):
+        if isinstance(other, LazyPath):
+            other = other.to_tuple()
+        return self.to_tuple() == other
+
+    def __hash__(self):
+        return hash(self.to_tuple())
+
+    def __repr__(self):
+        return f"LazyPath({self.to_tuple()})"
+
+
+def _as_tuple(path: TreePath | LazyPath) -> TreePath:
+    return path.to_tuple() if isinstance(path, LazyPath) else path
+
+
+def _as_lazy_path(path: TreePath | LazyPath | None) -> LazyPath:
+    if isinstance(path, LazyPath):
+        return path
+    return LazyPath.from_tuple(path or ())
 
 
 class TreePatch:
-    """A Tree representation of the patches of a merge"""
+    """
+    A path-indexed representation of the patches of a merge.
+
+    Patches are stored in append-only arrays, in the order they were applied
+    (parents before children): `paths[i]` was patched with operation `ops[i]`.
+    List items are recorded by their id_key (the index, for positional merges).
+    Paths may be recorded as LazyPath, and are turned into tuples when read.
+
+    Operations:
+        ADDED: new value added where there was none
+        REPLACED: old value replaced by the new one
+        MERGED: new container merged into the old one (its children are recorded)
+        KEPT: old value kept
+    """
+
+    ADDED, REPLACED, MERGED, KEPT = range(4)
+    op_names = ("added", "replaced", "merged", "kept")
+
+    __slots__ = ("_paths", "ops")
+
+    def __init__(self):
+        self._paths: list[TreePath | LazyPath] = []
+        self.ops = array("B")
+
+    @property
+    def paths(self) -> list[TreePath]:
+        return [_as_tuple(path) for path in self._paths]
+
+    def append(self, path: TreePath | LazyPath, op: int):
+        self._paths.append(path)
+        self.ops.append(op)
+
+    def extend_items(self, parent: LazyPath, keys: Iterable, ops: list[int]):
+        """Append the @ops of the items @keys of the @parent path."""
+        # plain tuples are cheaper to build than a LazyPath per item
+        parent = _as_tuple(parent)
+        self._paths.extend([parent + (key,) for key in keys])
+        self.ops.extend(ops)
+
+    def extend(self, other: TreePatch):
+        self._paths.extend(other._paths)
+        self.ops.extend(other.ops)
+
+    def touched_paths(self) -> Iterator[TreePath]:
+        """Yield the paths which were changed (added, replaced or merged)."""
+        kept = TreePatch.KEPT
+        return (
+            _as_tuple(path) for path, op in zip(self._paths, self.ops) if op != kept
+        )
+
+    def __iter__(self) -> Iterator[tuple[TreePath, int]]:
+        return ((_as_tuple(path), op) for path, op in zip(self._paths, self.ops))
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __getstate__(self):
+        # LazyPaths are not sent between processes
+        return self.paths, self.ops
+
+    def __setstate__(self, state):
+        self._paths, self.ops = state
+
+    def __repr__(self):
+        patches = ", ".join(f"{TreePatch.op_names[op]}:{path}" for path, op in self)
+        return f"TreePatch({patches})"
 
 
 # TODO: implement some understandable priority system here
@@ -125,6 +1236,9 @@ class PatcherMap:
     main_map:
         For each combination of (parent-type, old-type, new-type), it maps specific
         patchers to key:values found in the merge_policy received.
+    compiled_maps:
+        main_map entries compiled into flat dispatch tables (see CompiledPatcherMap).
+        Custom maps should be added with PatcherMap.register_map.
     level_map:
         Level-specific hooks that patches a MergePolicy instance only for that level,
         not passing this patch foward. E.g, the root special default behavior.
@@ -143,26 +1257,31 @@ class PatcherMap:
         diff: KeyDiff,
         merge_policy: MergePolicy,
         tree_path: tuple[str] = None,
-        action_map=None,
+        action_map: CompiledPatcherMap = None,
     ):
         """
         Patcher that will use to process old/new-values in relation to parent container.
-        """
-        parent_type = type(parent)
-        old_value, new_value = diff.diff_pair
 
-        old_type = PatcherMap._get_structural_type(old_value)
-        new_type = PatcherMap._get_structural_type(new_value)
+        Uses the compiled default map, unless a compiled @action_map is given
+        (see PatcherMap.compile and PatcherMap.register_map).
+        """
+        action_map = action_map or PatcherMap.compiled_maps[("default",)]
+        old_value, new_value = diff.old, diff.new
+        return action_map.get(parent, old_value, new_value, merge_policy, tree_path)
 
-        action_submap = PatcherMap.main_map[("default",)][
-            (parent_type, old_type, new_type)
-        ]
+    @staticmethod
+    def compile(action_map: dict) -> CompiledPatcherMap:
+        """Compile a (parent-type, old-type, new-type) action map for dispatching."""
+        return CompiledPatcherMap(action_map)
 
-        for policy_attr, policy_value, action_fn in action_submap:
-            if getattr(merge_policy, policy_attr, None) == policy_value:
-                action = action_fn
-                break
-        return action
+    @staticmethod
+    def register_map(action_map: dict, name: tuple = ("default",)):
+        """
+        Register @action_map under @name, compiling it.
+        Maps changed in-place should be registered again.
+        """
+        PatcherMap.main_map[name] = action_map
+        PatcherMap.compiled_maps[name] = CompiledPatcherMap(action_map)
 
     @staticmethod
     def _get_structural_type(value):
@@ -170,12 +1289,7 @@ class PatcherMap:
         Get values structural type to be used in the Merger.action_map.
         If its not a Dict, List or None, then its a Terminal.
         """
-        if type(value) in (dict, list):
-            return type(value)
-        elif value is None:
-            return None
-        else:
-            return Terminal
+        return _structural_types.get(type(value), Terminal)
 
     main_map = {
         ("default",): {
@@ -196,9 +1310,27 @@ class PatcherMap:
                 ("merge", True, subscribe_new),
                 ("merge", False, subscribe_new),
             ),
+            (dict, list, Terminal): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (dict, Terminal, list): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (dict, dict, list): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (dict, list, dict): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
             # list
             (dict, list, list): (
-                # ("merge_unique", True, "merge", True, use_merge),
+                # the list strategy (positional, append or append-unique) is
+                # chosen by the policy (see PseudoIdStrategies.for_policy)
+                ("merge_unique", True, use_merge),
                 ("merge", True, use_merge),
                 ("merge", False, use_merge),
             ),
@@ -206,6 +1338,69 @@ class PatcherMap:
                 ("merge", True, subscribe_new),
                 ("merge", False, subscribe_new),
             ),
+            # matched items (by position, or equal items with merge_unique)
+            (list, dict, dict): (
+                ("merge_unique", True, use_merge),
+                ("merge", True, use_merge),
+                ("merge", False, subscribe_new),
+            ),
+            (list, list, list): (
+                ("merge", True, use_merge),
+                ("merge", False, use_merge),
+            ),
+            (list, dict, Terminal): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (list, Terminal, dict): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (list, list, Terminal): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (list, Terminal, list): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (list, dict, list): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            (list, list, dict): (
+                ("merge", True, subscribe_new),
+                ("merge", False, subscribe_new),
+            ),
+            # lists of different lengths (or with @empty placeholders)
+            (list, None, Terminal): (
+                ("merge", True, append_new),
+                ("merge", False, append_new),
+            ),
+            (list, None, dict): (
+                ("merge", True, append_new),
+                ("merge", False, append_new),
+            ),
+            (list, None, list): (
+                ("merge", True, append_new),
+                ("merge", False, append_new),
+            ),
+            (list, None, None): (
+                ("merge", True, append_new),
+                ("merge", False, append_new),
+            ),
+            (list, Terminal, None): (
+                ("merge", True, keep_old),
+                ("merge", False, keep_old),
+            ),
+            (list, dict, None): (
+                ("merge", True, keep_old),
+                ("merge", False, keep_old),
+            ),
+            (list, list, None): (
+                ("merge", True, keep_old),
+                ("merge", False, keep_old),
+            ),
             # one side only
             (dict, None, Terminal): (
                 ("merge", True, subscribe_new),
@@ -236,11 +1431,146 @@ class PatcherMap:
 
     # The idea of this is that policies defined for a given /path are
     # used only in /path level and are not inherited by its children.
-    # TODO: change this case to level-based policy
-    tmp_path_based_policies = {
-        ("root",): MergePolicy(merge=True, merge_unique=True),
+    # Patterns may use wildcards and types (see PathPolicyTrie).
+    path_policies = PathPolicyTrie(
+        {
+            ("root",): MergePolicy(merge=True, merge_unique=True),
+        }
+    )
+
+    compiled_maps: dict[tuple, CompiledPatcherMap] = {}
+
+    # TreePatch operation recorded for each patcher. Unknown patchers are
+    # recorded as TreePatch.REPLACED (or ADDED, when there is no old value).
+    patch_ops = {
+        subscribe_new: TreePatch.REPLACED,
+        append_new: TreePatch.ADDED,
+        inset_new_at: TreePatch.ADDED,
+        keep_old: TreePatch.KEPT,
+        use_merge: TreePatch.MERGED,
     }
 
 
+_structural_types = {dict: dict, list: list, type(None): None}
+_container_types = frozenset((dict, list))
+
+
+class CompiledPatcherMap:
+    """
+    Flat dispatch table compiled from an action map (see PatcherMap.main_map).
+
+    Each rule of the action map is a tuple in the form:
+        (policy_attr, policy_value, [policy_attr, policy_value, ...], patcher)
+    where the first rule with all conditions matching the merge_policy is used.
+
+    The rules are pre-resolved for every combination of the policy values they
+    mention, so a lookup is a single dict access keyed by:
+        (parent-type, old-type, new-type, policy-values)
+    Policy values never mentioned in the rules (but the other value of flags)
+    fallback to scanning the rules.
+    """
+
+    def __init__(self, action_map: dict):
+        self.action_map = action_map
+
+        domains = {}
+        for rules in action_map.values():
+            for rule in rules:
+                for policy_attr, policy_value in _rule_conditions(rule):
+                    domains.setdefault(policy_attr, {})[policy_value] = None
+        # flags are compiled with both values, even when rules mention one only
+        for domain in domains.values():
+            if all(type(policy_value) is bool for policy_value in domain):
+                domain.update(dict.fromkeys((True, False)))
+        self.policy_attrs = tuple(domains)
+        if self.policy_attrs:
+            self._get_policy_values = attrgetter(*self.policy_attrs)
+        else:
+            self._get_policy_values = lambda merge_policy: ()
+
+        self._table = {}
+        for type_key, rules in action_map.items():
+            for combination in product(*domains.values()):
+                policy_values = dict(zip(self.policy_attrs, combination))
+                action = _match_rules(rules, policy_values.get)
+                if action is None:
+                    continue
+                if len(self.policy_attrs) == 1:
+                    (combination,) = combination
+                self._table[(*type_key, combination)] = action
+
+    def get(
+        self,
+        parent: dict | list,
+        old_value: Any,
+        new_value: Any,
+        merge_policy: MergePolicy,
+        tree_path: TreePath = None,
+    ) -> Callable:
+        """Return the patcher for the (parent, old_value, new_value) combination."""
+        return self.get_by_types(
+            type(parent),
+            _structural_types.get(type(old_value), Terminal),
+            _structural_types.get(type(new_value), Terminal),
+            merge_policy,
+            tree_path,
+        )
+
+    def get_by_types(
+        self,
+        parent_type: type,
+        old_type: type | None,
+        new_type: type | None,
+        merge_policy: MergePolicy,
+        tree_path: TreePath = None,
+    ) -> Callable:
+        """Return the patcher for the (parent, old, new) structural types."""
+        key = (parent_type, old_type, new_type, self._get_policy_values(merge_policy))
+        try:
+            return self._table[key]
+        except KeyError:
+            return self._resolve(key[:3], merge_policy, tree_path)
+
+    def _resolve(
+        self, type_key: tuple, merge_policy: MergePolicy, tree_path: TreePath
+    ) -> Callable:
+        """Slow-path: scan the rules for policy values not compiled in the table."""
+        rules = self.action_map.get(type_key, ())
+        action = _match_rules(
+            rules, lambda policy_attr: getattr(merge_policy, policy_attr, None)
+        )
+        if action is None:
+            raise KeyError(
+                f"No patcher for {type_key} with {merge_policy} at {tree_path}"
+            )
+        return action
+
+
+def _rule_conditions(rule: tuple) -> zip:
+    return zip(rule[:-1:2], rule[1:-1:2])
+
+
+def _match_rules(rules: tuple, get_policy_value: Callable) -> Callable | None:
+    for rule in rules:
+        if all(
+            get_policy_value(policy_attr) == policy_value
+            for policy_attr, policy_value in _rule_conditions(rule)
+        ):
+            return rule[-1]
+    return None
+
+
+# (old-type, new-type, patcher) of the list items merged by the terminal list
+# fast path (see Merger._merge_terminal_lists)
+_terminal_list_patchers = (
+    (Terminal, Terminal, subscribe_new),
+    (None, Terminal, append_new),
+    (Terminal, None, keep_old),
+    (None, None, append_new),
+)
+
+PatcherMap.register_map(PatcherMap.main_map[("default",)])
+
+
 if __name__ == "__main__":
     exit(main())
@@ -28,8 +28,8 @@ case_list = [
         {"a": "A"},
         {"b": "B"},
         [
-            KeyDiff("a", ("A", None), ("a", "a")),
-            KeyDiff("b", (None, "B"), ("b", "b")),
+            KeyDiff("a", "A", None, "a", "a"),
+            KeyDiff("b", None, "B", "b", "b"),
         ],
     ),
 ]
@@ -6,9 +6,11 @@ from typing import Callable
 
 
 from dynamerge.differ import KeyDiffer, KeyDiff, MergePolicy
+from dynamerge.fingerprint import Fingerprinter
 
 
 doc = __doc__
+canonical = Fingerprinter().canonical
 
 
 @dataclass
@@ -30,10 +32,10 @@ case_list = [
         [1, 2, 3, 4],
         [4, 3, 2, 1],
         [
-            KeyDiff(0, (1, 4), (0, 0)),
-            KeyDiff(1, (2, 3), (1, 1)),
-            KeyDiff(2, (3, 2), (2, 2)),
-            KeyDiff(3, (4, 1), (3, 3)),
+            KeyDiff(0, 1, 4, 0, 0),
+            KeyDiff(1, 2, 3, 1, 1),
+            KeyDiff(2, 3, 2, 2, 2),
+            KeyDiff(3, 4, 1, 3, 3),
         ],
     ),
     DiffCase(
@@ -43,9 +45,9 @@ case_list = [
         [1, {"a": "A", "b": "B"}, 3],
         [1, {"a": "A", "b": "B"}, 3],
         [
-            KeyDiff(0, (1, 1), (0, 0)),
-            KeyDiff(1, ({"a": "A", "b": "B"}, {"a": "A", "b": "B"}), (1, 1)),
-            KeyDiff(2, (3, 3), (2, 2)),
+            KeyDiff(0, 1, 1, 0, 0),
+            KeyDiff(1, {"a": "A", "b": "B"}, {"a": "A", "b": "B"}, 1, 1),
+            KeyDiff(2, 3, 3, 2, 2),
         ],
     ),
     DiffCase(
@@ -55,9 +57,9 @@ case_list = [
         [1, 2, 3],
         [3, 2],
         [
-            KeyDiff(0, (1, 3), (0, 0)),
-            KeyDiff(1, (2, 2), (1, 1)),
-            KeyDiff(2, (3, None), (2, None)),
+            KeyDiff(0, 1, 3, 0, 0),
+            KeyDiff(1, 2, 2, 1, 1),
+            KeyDiff(2, 3, None, 2, None),
         ],
     ),
     DiffCase(
@@ -67,9 +69,9 @@ case_list = [
         [1, 2],
         [3, 2, 1],
         [
-            KeyDiff(0, (1, 3), (0, 0)),
-            KeyDiff(1, (2, 2), (1, 1)),
-            KeyDiff(2, (None, 1), (None, 2)),
+            KeyDiff(0, 1, 3, 0, 0),
+            KeyDiff(1, 2, 2, 1, 1),
+            KeyDiff(2, None, 1, None, 2),
         ],
     ),
     DiffCase(
@@ -81,9 +83,9 @@ case_list = [
         [1, 2, 3],
         ["@empty", 2, "@empty"],
         [
-            KeyDiff(0, (1, "@empty"), (0, 0)),
-            KeyDiff(1, (2, 2), (1, 1)),
-            KeyDiff(2, (3, "@empty"), (2, 2)),
+            KeyDiff(0, 1, "@empty", 0, 0),
+            KeyDiff(1, 2, 2, 1, 1),
+            KeyDiff(2, 3, "@empty", 2, 2),
         ],
     ),
     DiffCase(
@@ -93,10 +95,10 @@ case_list = [
         [91, 92, 93],
         [92, 91, 90],
         [
-            KeyDiff(90, (None, 90), (None, 2)),
-            KeyDiff(91, (91, 91), (0, 1)),
-            KeyDiff(92, (92, 92), (1, 0)),
-            KeyDiff(93, (93, None), (2, None)),
+            KeyDiff(91, 91, 91, 0, 1),
+            KeyDiff(92, 92, 92, 1, 0),
+            KeyDiff(93, 93, None, 2, None),
+            KeyDiff(90, None, 90, None, 2),
         ],
     ),
     DiffCase(
@@ -106,10 +108,10 @@ case_list = [
         [1, {"a": "A"}, 3],
         [3, {"a": "A"}, 1],
         [
-            KeyDiff(1, (1, 1), (0, 2)),
-            KeyDiff(3, (3, 3), (2, 0)),
-            KeyDiff("__old_0__", ({"a": "A"}, None), (1, None)),
-            KeyDiff("__new_0__", (None, {"a": "A"}), (None, 1)),
+            KeyDiff(1, 1, 1, 0, 2),
+            KeyDiff("__old_0__", {"a": "A"}, None, 1, None),
+            KeyDiff(3, 3, 3, 2, 0),
+            KeyDiff("__new_0__", None, {"a": "A"}, None, 1),
         ],
     ),
     DiffCase(
@@ -124,12 +126,14 @@ case_list = [
         [91, 93, {"a": "A", "dynaconf_id": 1}],
         [93, {"a": "A", "dynaconf_id": 1}, 91],
         [
-            KeyDiff(91, (91, 91), (0, 2)),
-            KeyDiff(93, (93, 93), (1, 0)),
+            KeyDiff(91, 91, 91, 0, 2),
+            KeyDiff(93, 93, 93, 1, 0),
             KeyDiff(
                 "dynaconf_id_1",
-                ({"a": "A", "dynaconf_id": 1}, {"a": "A", "dynaconf_id": 1}),
-                (2, 1),
+                {"a": "A", "dynaconf_id": 1},
+                {"a": "A", "dynaconf_id": 1},
+                2,
+                1,
             ),
         ],
     ),
@@ -140,9 +144,97 @@ case_list = [
         [91, 93, {"a": "A", "c": "C"}],
         [93, {"a": "A", "d": "D"}, 91],
         [
-            KeyDiff(91, (91, 91), (0, 2)),
-            KeyDiff(93, (93, 93), (1, 0)),
-            KeyDiff("a_A", ({"a": "A", "c": "C"}, {"a": "A", "d": "D"}), (2, 1)),
+            KeyDiff(91, 91, 91, 0, 2),
+            KeyDiff(93, 93, 93, 1, 0),
+            KeyDiff("a_A", {"a": "A", "c": "C"}, {"a": "A", "d": "D"}, 2, 1),
+        ],
+        merge_policy=MergePolicy(dict_id_key="a"),
+    ),
+    DiffCase(
+        "mode-unique: unhashable values",
+        """\
+        Unhashable values which are not dicts (e.g, nested lists) use their
+        canonical form as id, so they are matched by content.
+        """,
+        KeyDiffer.pseudo_id_strategies.use_value_hash,
+        [91, [1, [2]]],
+        [[1, [2]], 92],
+        [
+            KeyDiff(91, 91, None, 0, None),
+            KeyDiff(canonical([1, [2]]), [1, [2]], [1, [2]], 1, 0),
+            KeyDiff(92, None, 92, None, 1),
+        ],
+    ),
+    DiffCase(
+        "mode-content-hash: structured values",
+        """\
+        Every value is identified by its content, so equal dicts and lists
+        match between old and new, regardless of their position.
+        """,
+        KeyDiffer.pseudo_id_strategies.use_content_hash,
+        [91, {"a": "A"}, [1, 2]],
+        [[1, 2], {"a": "A*"}, {"a": "A"}],
+        [
+            KeyDiff(91, 91, None, 0, None),
+            KeyDiff(canonical({"a": "A"}), {"a": "A"}, {"a": "A"}, 1, 2),
+            KeyDiff(canonical([1, 2]), [1, 2], [1, 2], 2, 0),
+            KeyDiff(canonical({"a": "A*"}), None, {"a": "A*"}, None, 1),
+        ],
+    ),
+    DiffCase(
+        "mode-append: records with custom key_id",
+        """\
+        Items never match, except for dicts with the dict_id_key, which are
+        identified by it (and keep it).
+        """,
+        KeyDiffer.pseudo_id_strategies.use_side_index,
+        [91, {"a": "A", "c": "C"}],
+        [{"a": "A", "d": "D"}, 91],
+        [
+            KeyDiff(("old", 0), 91, None, 0, None),
+            KeyDiff(("a", "A"), {"a": "A", "c": "C"}, {"a": "A", "d": "D"}, 1, 0),
+            KeyDiff(("new", 1), None, 91, None, 1),
+        ],
+        merge_policy=MergePolicy(dict_id_key="a"),
+    ),
+    DiffCase(
+        "mode-append: records with repeated key_id",
+        """\
+        Only the first dict with an id is identified by it: the next ones with
+        the same id are items without an id, so none of them are dropped.
+        """,
+        KeyDiffer.pseudo_id_strategies.use_side_index,
+        [{"a": "A", "c": "C"}, {"a": "A", "c": "D"}],
+        [{"a": "A", "d": "D"}, {"a": "A", "d": "E"}],
+        [
+            KeyDiff(("a", "A"), {"a": "A", "c": "C"}, {"a": "A", "d": "D"}, 0, 0),
+            KeyDiff(("old", 1), {"a": "A", "c": "D"}, None, 1, None),
+            KeyDiff(("new", 1), None, {"a": "A", "d": "E"}, None, 1),
+        ],
+        merge_policy=MergePolicy(dict_id_key="a"),
+    ),
+    DiffCase(
+        "mode-content-hash: records with repeated key_id",
+        """\
+        The next dicts with a repeated id are identified by their content, and
+        repeated contents by their first item.
+        """,
+        KeyDiffer.pseudo_id_strategies.use_content_hash,
+        [{"a": "A", "c": "C"}, {"a": "A", "c": "D"}, 91, 91],
+        [{"a": "A", "d": "D"}, {"a": "A", "c": "D"}, {"a": "A", "d": "E"}],
+        [
+            KeyDiff(("a", "A"), {"a": "A", "c": "C"}, {"a": "A", "d": "D"}, 0, 0),
+            KeyDiff(
+                canonical({"a": "A", "c": "D"}),
+                {"a": "A", "c": "D"},
+                {"a": "A", "c": "D"},
+                1,
+                1,
+            ),
+            KeyDiff(91, 91, None, 2, None),
+            KeyDiff(
+                canonical({"a": "A", "d": "E"}), None, {"a": "A", "d": "E"}, None, 2
+            ),
         ],
         merge_policy=MergePolicy(dict_id_key="a"),
     ),
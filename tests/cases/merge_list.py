@@ -18,5 +18,19 @@ cases = [
         {"root": {"listy": [21, 22, 23]}},
         {"root": {"listy": [91, 92, 93]}},
         {"root": {"listy": [91, 92, 93]}},
-    )
+    ),
+    MergeCase(
+        "append mode",
+        "Appends new items with the merge mark",
+        {"root": {"listy": [21, 22, 23]}},
+        {"root": {"listy": [23, 24, "dynaconf_merge"]}},
+        {"root": {"listy": [21, 22, 23, 23, 24]}},
+    ),
+    MergeCase(
+        "append-unique mode",
+        "Appends new items not found in old with the merge_unique mark",
+        {"root": {"listy": [21, 22, 23]}},
+        {"root": {"listy": [23, 24, 21, "dynaconf_merge_unique"]}},
+        {"root": {"listy": [21, 22, 23, 24]}},
+    ),
 ]
@@ -0,0 +1,68 @@
+"""
+Random settings trees, for properties which should hold for any tree.
+
+A (base, layers) set is generated from a seed, so the same seed always
+produces the same trees. Layers share the shape of base for common keys (dicts
+stay dicts, lists keep their length) and carry dynaconf marks randomly.
+"""
+from __future__ import annotations
+
+import random
+
+
+def generate_layers(
+    seed: int,
+    count: int,
+    width: int = 6,
+    depth: int = 3,
+    list_length: int = 3,
+    mark_density: float = 0.5,
+) -> tuple[dict, list[dict]]:
+    """Return a (base, layers) pair, with @count layers derived from base."""
+    rng = random.Random(seed)
+    base = _generate_dict(rng, width, depth, list_length)
+    layers = [
+        {"root": _derive(base, rng, mark_density, level=1)} for _ in range(count)
+    ]
+    return {"root": base}, layers
+
+
+def _generate_dict(rng: random.Random, width: int, depth: int, list_length: int):
+    data = {}
+    for i in range(width):
+        kind = i % 3
+        if kind == 0 and depth > 1:
+            data[f"key_{i}"] = _generate_dict(rng, width, depth - 1, list_length)
+        elif kind == 1:
+            data[f"key_{i}"] = [_terminal(rng) for _ in range(list_length)]
+        else:
+            data[f"key_{i}"] = _terminal(rng)
+    return data
+
+
+def _derive(old, rng: random.Random, mark_density: float, level: int):
+    if isinstance(old, list):
+        data = [_terminal(rng) if rng.random() < 0.5 else item for item in old]
+        if data and rng.random() < mark_density:
+            data.append("dynaconf_merge")
+        return data
+    if not isinstance(old, dict):
+        return _terminal(rng) if rng.random() < 0.5 else old
+
+    data = {
+        key: _derive(value, rng, mark_density, level + 1) for key, value in old.items()
+    }
+    if rng.random() < 0.2:
+        data[f"extra_{level}_{rng.randrange(1 << 16)}"] = _terminal(rng)
+    if rng.random() < mark_density:
+        data["dynaconf_merge"] = rng.random() < 0.5
+    return data
+
+
+def _terminal(rng: random.Random):
+    kind = rng.randrange(3)
+    if kind == 0:
+        return rng.randrange(1 << 16)
+    elif kind == 1:
+        return f"value_{rng.randrange(1 << 16)}"
+    return rng.random() < 0.5
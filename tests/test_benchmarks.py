@@ -0,0 +1,31 @@
+from benchmarks.baseline import object_merge
+from benchmarks.runner import BENCHMARKS, run
+from benchmarks.trees import TreeSpec, generate_pair
+import json
+
+
+def test_generate_pair_is_reproducible():
+    spec = TreeSpec(width=4, depth=3, mark_density=0.5, seed=42)
+    assert generate_pair(spec) == generate_pair(spec)
+    assert generate_pair(spec) != generate_pair(TreeSpec(width=4, depth=3, seed=1))
+
+
+def test_baseline_object_merge():
+    old = {"a": "A", "b": {"c": "C"}, "l": [1, 2]}
+    new = {"b": {"d": "D"}, "l": [3, "dynaconf_merge"], "dynaconf_merge": True}
+    assert object_merge(old, new) == {
+        "a": "A",
+        "b": {"c": "C", "d": "D"},
+        "l": [1, 2, 3],
+    }
+
+
+def test_run_report_is_json_serializable():
+    spec = TreeSpec(width=3, depth=2, list_length=2, mark_density=0.5)
+    report = run(spec, repeat=1, warmup=0)
+    assert [r["name"] for r in report["results"]] == list(BENCHMARKS)
+    for result in report["results"]:
+        assert result["ops_per_sec"] > 0
+        assert result["peak_memory_bytes"] >= 0
+    assert json.loads(json.dumps(report))["spec"] == spec.as_dict()
+    assert set(report["object_sizes"]) >= {"KeyDiff", "MergePolicy"}
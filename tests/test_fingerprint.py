@@ -0,0 +1,47 @@
+from dynamerge.fingerprint import Fingerprinter
+
+
+def test_digest_is_structural():
+    fingerprinter = Fingerprinter()
+    a = {"a": [1, {"b": "B"}], "c": {1, 2}}
+    b = {"c": {1, 2}, "a": [1, {"b": "B"}]}
+    assert fingerprinter.digest(a) == fingerprinter.digest(b)
+    assert fingerprinter.digest([1, 2]) != fingerprinter.digest([2, 1])
+
+
+def test_identical():
+    fingerprinter = Fingerprinter()
+    value = {"a": "A"}
+    assert fingerprinter.identical(value, value)
+    assert fingerprinter.identical({"a": [1, 2]}, {"a": [1, 2]})
+    assert not fingerprinter.identical({"a": [1, 2]}, {"a": [1, 3]})
+    assert not fingerprinter.identical({"a": "A"}, ["a"])
+    assert not fingerprinter.identical("A", "A")
+
+
+def test_canonical():
+    fingerprinter = Fingerprinter()
+    assert fingerprinter.canonical("a") == "a"
+    assert fingerprinter.canonical({"a": [1], "b": 2}) == fingerprinter.canonical(
+        {"b": 2, "a": [1]}
+    )
+    assert fingerprinter.canonical([1, 2]) != fingerprinter.canonical((1, 2))
+    assert fingerprinter.canonical([{1, 2}]) == fingerprinter.canonical([{2, 1}])
+    assert fingerprinter.canonical([[1]]) != fingerprinter.canonical([[True, 2]])
+    hash(fingerprinter.canonical([{"a": [{"b": {1, 2}}]}]))
+
+
+def test_canonical_is_memoized():
+    fingerprinter = Fingerprinter()
+    value = [{"a": "A"}]
+    assert fingerprinter.canonical(value) is fingerprinter.canonical(value)
+
+
+def test_forget():
+    fingerprinter = Fingerprinter()
+    value = {"a": "A", "dynaconf_merge": True}
+    digest = fingerprinter.digest(value)
+    value.pop("dynaconf_merge")
+    assert fingerprinter.digest(value) == digest  # memoized
+    fingerprinter.forget(value)
+    assert fingerprinter.digest(value) == fingerprinter.digest({"a": "A"})
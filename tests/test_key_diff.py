@@ -4,7 +4,7 @@ that helps setup complex scenarios for simple in==out assertions.
 
 Check the specific case parameters to understand it's the variables in play.
 """
-from dynamerge.differ import KeyDiffer, MergePolicy, DiffUtils
+from dynamerge.differ import KeyDiffer, KeyDiff, MergePolicy, PseudoIdStrategies
 import pytest
 from .cases import diff_list, diff_dict
 
@@ -29,11 +29,32 @@ def param_cases(cases):
 def test_diff_lists(case: diff_list.DiffCase):
     merge_policy = case.merge_policy or MergePolicy()
     diffs = KeyDiffer.diff_list(case.old, case.new, merge_policy, case.pseudo_id)
-    assert DiffUtils.sort_diff_list(diffs) == DiffUtils.sort_diff_list(case.exp)
+    assert diffs == case.exp  # diff order is deterministic
 
 
 @pytest.mark.parametrize("case", param_cases(diff_dict.case_list))
 def test_diff_dict(case: diff_dict.DiffCase):
     merge_policy = case.merge_policy or MergePolicy()
     diffs = KeyDiffer.diff_dict(case.old, case.new, merge_policy)
-    assert DiffUtils.sort_diff_list(diffs) == DiffUtils.sort_diff_list(case.exp)
+    assert diffs == case.exp  # diff order is deterministic
+
+
+def test_iter_dict_yields_lazily_old_keys_first():
+    old = {"a": "A", "b": "B"}
+    new = {"c": "C", "a": "A*"}
+    diffs = KeyDiffer.iter_dict(old, new)
+    assert next(diffs) == KeyDiff("a", "A", "A*", "a", "a")
+    # old keys may be re-assigned while consuming
+    old["a"] = "A*"
+    assert list(diffs) == [
+        KeyDiff("b", "B", None, "b", "b"),
+        KeyDiff("c", None, "C", "c", "c"),
+    ]
+
+
+def test_diff_list_order_is_stable():
+    """Old items in old order, then new-only items in new order"""
+    old = ["c", "a", "b"]
+    new = ["z", "b", "y", "a", "x"]
+    diffs = KeyDiffer.diff_list(old, new, None, PseudoIdStrategies.use_value_hash)
+    assert [diff.id_key for diff in diffs] == ["c", "a", "b", "z", "y", "x"]
@@ -0,0 +1,219 @@
+from dynamerge.main import BaseTree, LazyTree
+from dynamerge.marks import LazyGraph, LazyGraphCycleError
+from dynamerge.merger import Merger
+import pytest
+
+
+def test_lazy_graph_topological_order():
+    graph = LazyGraph()
+    graph.add(("c",), ("b",))
+    graph.add(("b",), ("a", "x"))
+    graph.add(("a", "x"))
+    graph.add(("d",), ("a",))
+    assert graph.topological_order() == [("a", "x"), ("b",), ("c",), ("d",)]
+    assert list(graph.iterate()) == graph.topological_order()
+    assert graph.topological_order([("c",), ("b",)]) == [("b",), ("c",)]
+
+    graph.add(("a", "x"), ("c",))
+    with pytest.raises(LazyGraphCycleError):
+        graph.topological_order()
+
+
+def test_lazy_graph_affected_by():
+    graph = LazyGraph()
+    graph.add(("root", "url"), ("root", "db", "host"))
+    graph.add(("root", "dsn"), ("root", "url"))
+    graph.add(("root", "summary"), ("root", "db"))
+    graph.add(("root", "other"), ("root", "cache"))
+
+    # changed inside a dependency, and transitively through other lazy values
+    assert graph.affected_by([("root", "db", "host")]) == {
+        ("root", "url"),
+        ("root", "dsn"),
+        ("root", "summary"),
+    }
+    # a replaced container affects the dependencies under it
+    assert graph.affected_by([("root", "db")]) == {
+        ("root", "url"),
+        ("root", "dsn"),
+        ("root", "summary"),
+    }
+    assert graph.affected_by([("root", "db", "port")]) == {("root", "summary")}
+
+    graph.remove(("root", "summary"))
+    graph.remove(("root", "url"))
+    assert graph.affected_by([("root", "db")]) == set()
+    assert graph.dependents(("root", "url")) == {("root", "dsn")}
+
+
+def test_lazy_tree_evaluates_only_dirty_values():
+    base = {"root": {"db": {"host": "localhost", "port": 5432}, "cache": "redis"}}
+    calls = []
+
+    def get(path):
+        if path in lazy_tree.lazy_values:
+            return lazy_tree.evaluated[path]
+        value = base
+        for key in path:
+            value = value[key]
+        return value
+
+    def url(get):
+        calls.append("url")
+        return f"{get(('root', 'db', 'host'))}:{get(('root', 'db', 'port'))}"
+
+    def dsn(get):
+        calls.append("dsn")
+        return "db://" + get(("root", "url"))
+
+    def cache_url(get):
+        calls.append("cache_url")
+        return get(("root", "cache")) + "://"
+
+    lazy_tree = LazyTree()
+    lazy_tree.add(("root", "dsn"), dsn, ("root", "url"))
+    lazy_tree.add(("root", "url"), url, ("root", "db", "host"), ("root", "db", "port"))
+    lazy_tree.add(("root", "cache_url"), cache_url, ("root", "cache"))
+    assert lazy_tree.evaluate_dirty(get) == [
+        ("root", "url"),
+        ("root", "dsn"),
+        ("root", "cache_url"),
+    ]
+    assert lazy_tree.evaluated[("root", "dsn")] == "db://localhost:5432"
+
+    calls.clear()
+    new = {"root": {"db": {"host": "db.local", "dynaconf_merge": True}}}
+    dirty = lazy_tree.update_with_patch(Merger.merge(base, new).tree_patch)
+    assert dirty == {("root", "url"), ("root", "dsn")}
+    lazy_tree.evaluate_dirty(get)
+    assert calls == ["url", "dsn"]
+    assert lazy_tree.evaluated[("root", "dsn")] == "db://db.local:5432"
+    assert lazy_tree.evaluate_dirty(get) == []
+
+
+def test_lazy_tree_drops_replaced_lazy_values():
+    lazy_tree = LazyTree()
+    lazy_tree.add(("root", "a", "b"), lambda get: 1)
+    lazy_tree.add(("root", "c"), lambda get: 2, ("root", "a", "b"))
+    lazy_tree.evaluate_dirty(lambda path: None)
+
+    base = {"root": {"a": {"b": "@format"}, "c": "@format"}}
+    patch = Merger.merge(base, {"root": {"a": {"x": 1}}}).tree_patch
+    assert lazy_tree.update_with_patch(patch) == {("root", "c")}
+    assert ("root", "a", "b") not in lazy_tree.lazy_values
+
+
+def test_base_tree_get_caches_lazy_values():
+    tree = BaseTree(cache_size=2)
+    tree.merge({"root": {"host": "localhost", "port": 80}})
+    calls = []
+
+    def url(get):
+        calls.append("url")
+        return f"http://{get('root.host')}:{get(('root', 'port'))}"
+
+    tree.lazy_tree.add(("root", "url"), url, ("root", "host"), ("root", "port"))
+    assert tree.get("root.url") == "http://localhost:80"
+    assert tree.get("root.url") == "http://localhost:80"
+    assert calls == ["url"]
+    assert tree.stats["cache_hits"] == 1
+    assert tree.stats["cache_misses"] == 1
+    assert tree.get("root.missing", "default") == "default"
+
+    # a merge touching a dependency invalidates the cached value
+    tree.merge({"root": {"dynaconf_merge": True, "host": "example.com"}})
+    assert tree.get("root.url") == "http://example.com:80"
+    assert calls == ["url", "url"]
+
+    # unrelated merges keep it
+    tree.set("root.other", 1)
+    assert tree.get("root.url") == "http://example.com:80"
+    assert tree.get("root.port") == 80
+    assert calls == ["url", "url"]
+
+
+def test_lazy_tree_cache_eviction():
+    lazy_tree = LazyTree(cache_size=2)
+    for name in "abc":
+        lazy_tree.add((name,), lambda get, name=name: name.upper())
+
+    for name in "abc":
+        assert lazy_tree.get_evaluated((name,), None) == (name.upper(), False)
+    assert len(lazy_tree.evaluated) == 2
+    assert lazy_tree.get_evaluated(("c",), None) == ("C", True)
+    # least recently used was evicted
+    assert lazy_tree.get_evaluated(("a",), None) == ("A", False)
+    assert ("b",) not in lazy_tree.evaluated
+
+
+@pytest.mark.parametrize("path_index_size", [None, 3])
+def test_base_tree_path_index(path_index_size):
+    tree = BaseTree(path_index=True, path_index_size=path_index_size)
+    tree.merge({"app": {"db": {"host": "localhost", "port": 80}, "tags": [1, 2]}})
+    index = tree.path_index
+    assert index.bounded is (path_index_size is not None)
+    if not index.bounded:
+        assert "app.db.host" in index
+        assert "app.tags" in index
+
+    assert tree.get("app.db.host") == "localhost"
+    assert tree.get("app.db.port") == 80
+    assert tree.get(("app", "tags", 1)) == 2
+    assert tree.get("app.db.user", "admin") == "admin"
+    assert "app.db.host" in index
+    assert "app.db.user" not in index
+
+    # replaced subtrees are dropped, and the changed paths are re-read
+    tree.set("app.db", {"host": "example.com"})
+    assert tree.get("app.db.host") == "example.com"
+    assert tree.get("app.db.port") is None
+    assert tree.get("app.db") == {"host": "example.com"}
+    assert "app.db.port" not in index
+
+    tree.set("app.db.port", 8080)
+    assert tree.get("app.db.port") == 8080
+    assert tree.get("app.db.host") == "example.com"
+    assert tree.get("app.tags") == [1, 2]
+    if index.bounded:
+        assert len(index) == 3
+
+
+def test_base_tree_set_overwrites_other_types():
+    tree = BaseTree()
+    tree.merge({"app": {"hosts": ["a", "b"], "db": {"host": "localhost"}, "x": 1}})
+
+    tree.set("app.hosts", "a")
+    tree.set("app.db", ["db1", "db2"])
+    tree.set("app.x", {"y": 2})
+    assert tree.get("app") == {"hosts": "a", "db": ["db1", "db2"], "x": {"y": 2}}
+
+    tree.set("app.db", {"host": "example.com"})
+    tree.set("app.hosts", ["c"])
+    assert tree.get("app") == {
+        "hosts": ["c"],
+        "db": {"host": "example.com"},
+        "x": {"y": 2},
+    }
+
+
+@pytest.mark.parametrize("path_index", [False, True])
+def test_base_tree_set_replaces_lists(path_index):
+    tree = BaseTree(path_index=path_index)
+    tree.merge({"app": {"hosts": ["a", "b"], "port": 80}, "tags": [1, 2, 3]})
+    assert tree.get("app.hosts") == ["a", "b"]
+
+    tree.set("app.hosts", ["c"])
+    tree.set("tags", [4])
+    assert tree.base_dict == {"app": {"hosts": ["c"], "port": 80}, "tags": [4]}
+    assert tree.get("app.hosts") == ["c"]
+
+
+def test_base_tree_set_missing_path():
+    tree = BaseTree()
+    tree.set("a.b.c", 1)
+    assert tree.base_dict == {"a": {"b": {"c": 1}}}
+    assert tree.get("a.b") == {"c": 1}
+
+    tree.set("a.x.y", {"z": [1]})
+    tree.set("a.b.d", [2])
+    assert tree.base_dict == {"a": {"b": {"c": 1, "d": [2]}, "x": {"y": {"z": [1]}}}}
@@ -1,5 +1,6 @@
 from dynamerge.marks import MarkupParser, TokenParser
 from dynamerge.merge_policy import MergePolicy
+import sys
 import pytest
 from icecream import ic
 
@@ -22,3 +23,65 @@ def test_merge_mark_parsing():
 )
 def test_token_parser(string, output):
     assert TokenParser.parse(string) == output
+
+
+@pytest.mark.parametrize(
+    "string",
+    ["", "@", "@foo ", "@foo  bar", "@foo @bar", "@foo bar@spam", "@a b @c d @e"],
+)
+def test_token_parser_edge_cases(string):
+    # the character-by-character reference implementation
+    token_word, token_arg, token_list = [], [], []
+    capture_mode = "token_word"
+    for char in string[1:]:
+        if capture_mode == "token_word":
+            if char == " ":
+                capture_mode = "token_arg"
+            else:
+                token_word.append(char)
+        elif char == "@":
+            capture_mode = "token_word"
+            token_list.append(("".join(token_word), "".join(token_arg[:-1])))
+            token_word.clear()
+            token_arg.clear()
+        else:
+            token_arg.append(char)
+    token_list.append(("".join(token_word), "".join(token_arg)))
+
+    assert TokenParser.parse(string) == token_list
+    # cached results are not shared
+    TokenParser.parse(string).clear()
+    assert TokenParser.parse(string) == token_list
+
+
+def test_parse_tree_strips_list_marks():
+    base_dict = {"a": ["dynaconf_merge", {"b": "B"}, "@empty", 1]}
+    result = MarkupParser(base_dict).parse_tree()
+    assert base_dict == {"a": [{"b": "B"}, None, 1]}
+
+    node = result.merge_policy_tree["a"]
+    assert node.mark_list == (("merge", True),)
+    # children are indexed by their position after stripping the marks
+    assert [child.key for child in node.children] == [0, 1, 2]
+    assert node[0]["b"].merge_policy == MergePolicy()
+
+
+def test_parse_tree_backtracks_merge_mark():
+    base_dict = {"a": {"b": {"c": {"dynaconf_merge": True}}, "d": {"e": "E"}}}
+    tree = MarkupParser(base_dict).parse_tree().merge_policy_tree
+    assert tree["a"].level_mark_list == (("merge", True),)
+    assert tree["a"]["b"].level_mark_list == (("merge", True),)
+    assert tree["a"]["b"]["c"].mark_list == (("merge", True),)
+    # level marks are not inherited by siblings
+    assert tree["a"]["d"].merge_policy == MergePolicy()
+
+
+def test_parse_tree_deep_tree():
+    depth = sys.getrecursionlimit() * 2
+    base_dict = leaf = {"dynaconf_merge": True}
+    for _ in range(depth):
+        leaf["n"] = leaf = {}
+    tree = MarkupParser(base_dict).parse_tree().merge_policy_tree
+    assert "dynaconf_merge" not in base_dict
+    assert tree.mark_list == (("merge", True),)
+    assert tree["n"].merge_policy == MergePolicy(merge=True)
@@ -4,10 +4,22 @@ that helps setup complex scenarios for simple in==out assertions.
 
 Check the specific case parameters to understand it's the variables in play.
 """
-from dynamerge.merge_policy import MergePolicy
-from dynamerge.merger import Merger
+from dynamerge.merge_policy import MergePolicy, PathPolicyTrie
+from dynamerge.merger import (
+    LazyPath,
+    Merger,
+    PatcherMap,
+    TreePatch,
+    keep_old,
+    subscribe_new,
+    use_merge,
+)
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import copy
+import sys
 import pytest
-from .cases import merge_dict, merge_list
+from .cases import merge_dict, merge_list, random_trees
 
 
 @pytest.fixture(autouse=True)
@@ -25,16 +37,471 @@ def param_cases(cases):
     return param_cases
 
 
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
 @pytest.mark.parametrize("case", param_cases(merge_dict.cases))
-def test_merge_dicts(case: merge_dict.MergeCase):
+def test_merge_dicts(case: merge_dict.MergeCase, engine):
+    case = copy.deepcopy(case)  # merging mutates the case
     merge_policy = MergePolicy()
     # breakpoint()
-    Merger().merge_containers(case.old, case.new, merge_policy)
+    Merger.engines[engine](case.old, case.new, merge_policy)
     assert case.old == case.expected
 
 
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
 @pytest.mark.parametrize("case", param_cases(merge_list.cases))
-def test_merge_lists(case: merge_list.MergeCase):
+def test_merge_lists(case: merge_list.MergeCase, engine):
+    case = copy.deepcopy(case)  # merging mutates the case
     merge_policy = MergePolicy()
-    Merger().merge_containers(case.old, case.new, merge_policy)
+    Merger.engines[engine](case.old, case.new, merge_policy)
     assert case.old == case.expected
+
+
+def test_compiled_patcher_map():
+    action_map = PatcherMap.compile(
+        {
+            (dict, list, list): (
+                ("merge_unique", True, "merge", True, keep_old),
+                ("merge", True, use_merge),
+                (subscribe_new,),
+            ),
+        }
+    )
+    get = partial(action_map.get, {}, [1], [2])
+    assert get(MergePolicy(merge=True, merge_unique=True)) is keep_old
+    assert get(MergePolicy(merge=True)) is use_merge
+    assert get(MergePolicy(merge_unique=True)) is subscribe_new
+    # values not mentioned in rules fallback to scanning them
+    assert get(MergePolicy(merge=None, merge_unique=None)) is subscribe_new
+    with pytest.raises(KeyError):
+        action_map.get({}, {}, [2], MergePolicy())
+
+
+def test_default_patcher_map():
+    get = PatcherMap.compiled_maps[("default",)].get
+    assert get({}, {"a": 1}, {"b": 2}, MergePolicy(merge=True)) is use_merge
+    assert get({}, {"a": 1}, {"b": 2}, MergePolicy(merge=False)) is subscribe_new
+    assert get({}, 1, None, MergePolicy()) is keep_old
+
+
+@pytest.mark.parametrize("case", param_cases(merge_dict.cases))
+def test_merge_dicts_skip_identical(case: merge_dict.MergeCase):
+    case = copy.deepcopy(case)
+    Merger.merge(case.old, case.new, skip_identical=True)
+    assert case.old == case.expected
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+@pytest.mark.parametrize("case", param_cases(merge_list.cases))
+def test_merge_lists_skip_identical(case: merge_list.MergeCase, engine):
+    default_case, skipping_case = copy.deepcopy(case), copy.deepcopy(case)
+    Merger.merge(default_case.old, default_case.new, engine=engine)
+    Merger.merge(
+        skipping_case.old, skipping_case.new, engine=engine, skip_identical=True
+    )
+    assert skipping_case.old == default_case.old == case.expected
+
+
+@pytest.mark.parametrize("preparse", [False, True])
+def test_merge_skip_identical_appending_lists(preparse):
+    def pair():
+        old = {"root": {"d": {"l": [1, 2]}, "l": [1, 2]}}
+        new = {
+            "root": {
+                "d": {"dynaconf_merge": True, "l": [1, 2]},
+                "l": [1, 2, "dynaconf_merge"],
+            }
+        }
+        return old, new
+
+    old, new = pair()
+    Merger.merge(old, new, preparse=preparse)
+    assert old == {"root": {"d": {"l": [1, 2, 1, 2]}, "l": [1, 2, 1, 2]}}
+
+    old, new = pair()
+    result = Merger.merge(old, new, skip_identical=True, preparse=preparse)
+    # "d" is equal once its marks are stripped, so it is kept as is, but an
+    # appending list is never skipped (it changes even when both are equal)
+    assert old == {"root": {"d": {"l": [1, 2]}, "l": [1, 2, 1, 2]}}
+    assert result.skipped_node_count == 1
+
+
+def test_merge_skip_identical_merged_dicts():
+    old = {"root": {"a": {"b": {"c": [1, 2]}}, "d": "D"}}
+    new = {"root": {"dynaconf_merge": True, "a": {"b": {"c": [1, 2]}}, "d": "D*"}}
+    result = Merger.merge(old, new, skip_identical=True)
+    # "a" is merged under merge=true, but it is still skipped
+    assert result.skipped_node_count == 1
+    assert old == {"root": {"a": {"b": {"c": [1, 2]}}, "d": "D*"}}
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+@pytest.mark.parametrize("case", param_cases(merge_dict.cases + merge_list.cases))
+def test_merge_preparsed(case: merge_dict.MergeCase, engine):
+    case = copy.deepcopy(case)
+    Merger.merge(case.old, case.new, engine=engine, preparse=True)
+    assert case.old == case.expected
+
+
+# merge=true marks are only backtracked to their ancestors by the preparse pass
+backtracked_cases = {"2-2 when merge-true(lvl-2) mark should merge"}
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+@pytest.mark.parametrize("case", param_cases(merge_dict.cases + merge_list.cases))
+def test_merge_preparse_matches_default(case: merge_dict.MergeCase, engine):
+    default_case, preparsed_case = copy.deepcopy(case), copy.deepcopy(case)
+    default = Merger.merge(default_case.old, default_case.new, engine=engine)
+    preparsed = Merger.merge(
+        preparsed_case.old, preparsed_case.new, engine=engine, preparse=True
+    )
+    assert preparsed_case.old == case.expected
+    if case.name in backtracked_cases:
+        return
+    assert default_case.old == case.expected
+    assert list(preparsed.tree_patch) == list(default.tree_patch)
+
+
+@pytest.mark.parametrize("preparse", [False, True])
+def test_merge_explicit_merge_false_wins_level_marks(preparse):
+    old = {"root": {"a": {"b": {"c": "C"}, "d": "D"}}}
+    new = {"root": {"a": {"dynaconf_merge": False, "b": {"dynaconf_merge": True}}}}
+    Merger.merge(old, new, preparse=preparse)
+    # "a" is replaced, even though a merge=true is found below it
+    assert list(old["root"]["a"]) == ["b"]
+    assert "c" not in old["root"]["a"]["b"]
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_merge_wildcard_path_policy(engine, monkeypatch):
+    merge = MergePolicy(merge=True)
+    path_policies = PathPolicyTrie(
+        {("root",): merge, ("root", "*"): merge, ("root", "*", "databases"): merge}
+    )
+    monkeypatch.setattr(PatcherMap, "path_policies", path_policies)
+    old = {"root": {"a": {"databases": {"x": 1}, "b": {"y": 2}}}}
+    new = {"root": {"a": {"databases": {"z": 3}, "b": {"w": 4}}}}
+    Merger.merge(old, new, engine=engine)
+    # path policies are not inherited, so "b" is replaced
+    assert old == {"root": {"a": {"databases": {"x": 1, "z": 3}, "b": {"w": 4}}}}
+
+
+@pytest.mark.parametrize("preparse", [False, True])
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_merge_list_path_policy(engine, preparse, monkeypatch):
+    path_policies = PathPolicyTrie(
+        {
+            ("root",): MergePolicy(merge=True),
+            ("root", "hosts"): MergePolicy(merge=True),
+            ("root", "tags"): MergePolicy(merge_unique=True),
+        }
+    )
+    monkeypatch.setattr(PatcherMap, "path_policies", path_policies)
+    old = {"root": {"hosts": [1, 2], "tags": ["a", "b"], "ports": [1, 2]}}
+    new = {"root": {"hosts": [3], "tags": ["b", "c"], "ports": [3]}}
+    Merger.merge(old, new, engine=engine, preparse=preparse)
+    # the policy of a list path selects its strategy, as it merges a dict path
+    assert old["root"] == {"hosts": [1, 2, 3], "tags": ["a", "b", "c"], "ports": [3, 2]}
+
+
+def test_merge_skip_identical_counter():
+    shared = {"x": [1, 2]}
+    old = {"root": {"a": {"b": "B"}, "c": shared, "d": {"e": "E"}}}
+    new = {"root": {"a": {"b": "B"}, "c": shared, "d": {"e": "E*"}}}
+    result = Merger.merge(old, new, skip_identical=True)
+    assert result.skipped_node_count == 2
+    assert old == {"root": {"a": {"b": "B"}, "c": shared, "d": {"e": "E*"}}}
+    assert Merger.merge(old, new).skipped_node_count == 0
+
+
+@pytest.mark.parametrize("preparse", [False, True])
+def test_merge_iterative_engine_deep_tree(preparse):
+    def nested(depth, leaf):
+        tree = leaf
+        for _ in range(depth):
+            tree = {"n": tree, "dynaconf_merge": True}
+        return {"root": tree}
+
+    depth = sys.getrecursionlimit() * 2
+    old, new = nested(depth, {"a": "A"}), nested(depth, {"b": "B"})
+    Merger.merge(old, new, engine="iterative", preparse=preparse)
+    node = old["root"]
+    for _ in range(depth):
+        node = node["n"]
+    assert node == {"a": "A", "b": "B"}
+
+    with pytest.raises(ValueError):
+        Merger.merge({}, {}, engine="unknown")
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_merge_tree_patch(engine):
+    old = {"root": {"a": "A", "b": {"c": "C"}, "d": {"e": "E"}}}
+    new = {"root": {"a": "A*", "b": {"f": "F", "dynaconf_merge": True}, "g": "G"}}
+    result = Merger.merge(old, new, engine=engine)
+    assert [(path, TreePatch.op_names[op]) for path, op in result.tree_patch] == [
+        (("root",), "merged"),
+        (("root", "a"), "replaced"),
+        (("root", "b"), "merged"),
+        (("root", "b", "c"), "kept"),
+        (("root", "b", "f"), "added"),
+        (("root", "d"), "kept"),
+        (("root", "g"), "added"),
+    ]
+    assert list(result.tree_patch.touched_paths()) == [
+        ("root",),
+        ("root", "a"),
+        ("root", "b"),
+        ("root", "b", "f"),
+        ("root", "g"),
+    ]
+    assert result.merge_operation_count == 7
+
+    result = Merger.merge({"a": "A"}, {"a": "A*"}, record_patch=False)
+    assert result.tree_patch is None
+    assert result.merge_operation_count == 1
+
+
+def test_lazy_path():
+    root = LazyPath.from_tuple(("root",))
+    path = root.child("a").child(0)
+    assert path._path is None
+    assert path.to_tuple() == ("root", "a", 0)
+    assert path.to_tuple() is path.to_tuple()
+    assert path == ("root", "a", 0)
+    assert LazyPath.root().child("x") == LazyPath.from_tuple(("x",))
+
+
+@pytest.mark.parametrize("executor_cls", [ThreadPoolExecutor, ProcessPoolExecutor])
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_merge_parallel_matches_serial(engine, executor_cls):
+    def section(i, value):
+        return {"x": i, "y": {"z": value, "dynaconf_merge": True}, "w": [i, value]}
+
+    old = {"root": {f"s{i}": section(i, "old") for i in range(6)}}
+    new = {"root": {f"s{i}": section(i, "new") for i in range(1, 8)}}
+    for i in range(1, 8):
+        new["root"][f"s{i}"]["dynaconf_merge"] = True
+    new["root"]["s3"] = "replaced"
+
+    serial_old = copy.deepcopy(old)
+    serial = Merger.merge(serial_old, copy.deepcopy(new), engine=engine)
+    with executor_cls(max_workers=2) as executor:
+        parallel = Merger.merge(
+            old,
+            new,
+            engine=engine,
+            parallel=True,
+            parallel_threshold=3,
+            executor=executor,
+        )
+    assert old == serial_old
+    assert list(parallel.tree_patch) == list(serial.tree_patch)
+    assert parallel.merge_operation_count == serial.merge_operation_count
+
+
+def test_merge_parallel_small_merge_stays_serial():
+    old = {"root": {"a": {"b": 1}, "c": {"d": 2}}}
+    new = {"root": {"a": {"b": 3, "dynaconf_merge": True}, "c": {"e": 4}}}
+    result = Merger.merge(old, new, parallel=True)
+    assert old == {"root": {"a": {"b": 3}, "c": {"e": 4}}}
+    assert len(result.tree_patch) == 4
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merge_many_matches_sequential(seed):
+    base, layers = random_trees.generate_layers(seed, 3)
+    sequential_base = copy.deepcopy(base)
+    for layer in copy.deepcopy(layers):
+        Merger.merge(sequential_base, layer)
+
+    Merger.merge_many(base, layers)
+    assert base == sequential_base
+    assert list(base["root"]) == list(sequential_base["root"])
+
+
+def test_merge_many():
+    base = {"root": {"a": {"x": 1}, "b": [1], "c": {"y": 1}}}
+    layers = [
+        {"root": {"a": {"x": 2, "dynaconf_merge": True}, "b": [2, "dynaconf_merge"]}},
+        {"root": {"c": {"z": 2}, "d": "D"}},
+        {"root": {"a": {"w": 3, "dynaconf_merge": True}, "c": {"k": 3}}},
+    ]
+    result = Merger.merge_many(base, layers)
+    # the merge mark appends to the list
+    assert base == {
+        "root": {"a": {"x": 2, "w": 3}, "b": [1, 2], "c": {"k": 3}, "d": "D"}
+    }
+    assert result.tree is base
+    assert [(path, TreePatch.op_names[op]) for path, op in result.tree_patch] == [
+        (("root",), "merged"),
+        (("root", "a"), "merged"),
+        (("root", "a", "x"), "replaced"),
+        (("root", "a", "w"), "added"),
+        (("root", "b"), "merged"),
+        (("root", "b", ("old", 0)), "kept"),
+        (("root", "b", ("new", 0)), "added"),
+        (("root", "c"), "replaced"),
+        (("root", "d"), "added"),
+    ]
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+@pytest.mark.parametrize("case", param_cases(merge_dict.cases + merge_list.cases))
+def test_merge_persistent(case: merge_dict.MergeCase, engine):
+    case = copy.deepcopy(case)
+    snapshot = copy.deepcopy(case.old)
+    result = Merger.merge(
+        case.old, case.new, engine=engine, persistent=True, preparse=True
+    )
+    assert result.tree == case.expected
+    assert case.old == snapshot
+
+
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+def test_merge_persistent_shares_unchanged_subtrees(engine):
+    old = {"root": {"a": {"b": {"c": 1}, "d": {"e": 2}}, "f": {"g": 3}}}
+    new = {"root": {"a": {"b": {"c": 9}, "dynaconf_merge": True}}}
+    result = Merger.merge(old, new, engine=engine, persistent=True)
+    tree = result.tree
+    assert tree == {"root": {"a": {"b": {"c": 9}, "d": {"e": 2}}, "f": {"g": 3}}}
+    assert old["root"]["a"]["b"] == {"c": 1}
+    # the changed spine is copied, the rest is shared
+    assert tree is not old and tree["root"] is not old["root"]
+    assert tree["root"]["a"] is not old["root"]["a"]
+    assert tree["root"]["a"]["d"] is old["root"]["a"]["d"]
+    assert tree["root"]["f"] is old["root"]["f"]
+
+    assert Merger.merge(old, {}, engine=engine, persistent=True).tree is old
+    assert Merger.merge(old, {"x": 1}).tree is old
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+@pytest.mark.parametrize("engine", ["recursive", "iterative"])
+@pytest.mark.parametrize(
+    "mark,old_list,new_list,expected",
+    [
+        (None, [1, 2, 3], [4, 5, 6], [4, 5, 6]),
+        (None, [1, 2, 3], [4], [4, 2, 3]),
+        (None, [1], [4, 5, None], [4, 5, None]),
+        (None, [1, 2, 3], [None, 5], [1, 5, 3]),
+        (None, [None, 2], [4, None, 6], [4, 2, 6]),
+        (None, [1, 2], [None], [1, 2]),
+        (None, [], ["a", 1.5, True], ["a", 1.5, True]),
+        (None, [2, "a", None, 1], [1], [1, "a", None, 1]),
+        (None, [None, 2], [None, None], [None, 2]),
+        (None, [None], [], [None]),
+        ("dynaconf_merge", [1, 2], [2, 3], [1, 2, 2, 3]),
+        ("dynaconf_merge", [None, 1], [None], [None, 1, None]),
+        ("dynaconf_merge", [1], [], [1]),
+        ("dynaconf_merge_unique", [1, 2, 1], [3, 2, 4, 3], [1, 2, 1, 3, 4]),
+        ("dynaconf_merge_unique", [None, "a"], ["b", None], [None, "a", "b"]),
+        ("dynaconf_merge_unique", [1, 2], [2, 1], [1, 2]),
+    ],
+)
+def test_merge_terminal_lists(
+    mark, old_list, new_list, expected, engine, persistent, monkeypatch
+):
+    def merge(old_list, new_list):
+        old = {"root": {"l": old_list}}
+        new = {"root": {"l": new_list + ([mark] if mark else [])}}
+        result = Merger.merge(old, new, engine=engine, persistent=persistent)
+        assert old["root"]["l"] == (old_list if persistent else expected)
+        return result
+
+    fast = merge(list(old_list), list(new_list))
+    assert fast.tree["root"]["l"] == expected
+
+    # same results as diffing the lists item by item
+    monkeypatch.setattr(
+        Merger, "_merge_terminal_lists", staticmethod(lambda *args: None)
+    )
+    slow = merge(list(old_list), list(new_list))
+    assert slow.tree == fast.tree
+    assert list(slow.tree_patch) == list(fast.tree_patch)
+    assert slow.merge_operation_count == fast.merge_operation_count
+
+
+def test_merge_lists_unique_unhashable():
+    old = {"root": {"l": [{"a": 1}, [1], {1, 2}, "x"]}}
+    new = {"root": {"l": [{2, 1}, {"a": 1}, {"b": 2}, [1], "dynaconf_merge_unique"]}}
+    Merger.merge(old, new)
+    assert old == {"root": {"l": [{"a": 1}, [1], {1, 2}, "x", {"b": 2}]}}
+
+
+@pytest.mark.parametrize("mark", ["dynaconf_merge", "dynaconf_merge_unique"])
+def test_merge_lists_by_dict_id_key(mark):
+    old = {
+        "root": {
+            "services": [
+                {"serviceName": "a", "port": 1},
+                {"serviceName": "b", "port": 2, "tags": ["x"]},
+            ]
+        }
+    }
+    new = {
+        "root": {
+            "services": [
+                {"serviceName": "c", "port": 4},
+                {"serviceName": "b", "port": 3, "tags": ["y"]},
+                "dynaconf_id_key=serviceName",
+                mark,
+            ]
+        }
+    }
+    Merger.merge(old, new)
+    # matched records are merged (ids are kept), and new ones appended
+    assert old == {
+        "root": {
+            "services": [
+                {"serviceName": "a", "port": 1},
+                {"serviceName": "b", "port": 3, "tags": ["x", "y"]},
+                {"serviceName": "c", "port": 4},
+            ]
+        }
+    }
+
+
+@pytest.mark.parametrize("mark", ["dynaconf_merge", "dynaconf_merge_unique"])
+def test_merge_lists_by_repeated_dict_id_key(mark):
+    old = {"root": {"l": [{"name": "a", "p": 1}, {"name": "a", "p": 2}]}}
+    new = {
+        "root": {
+            "l": [
+                {"name": "a", "p": 3, "q": 1},
+                {"name": "b", "p": 4},
+                {"name": "b", "p": 5},
+                "dynaconf_id_key=name",
+                mark,
+            ]
+        }
+    }
+    Merger.merge(old, new)
+    # a repeated id only matches its first record: the others are kept apart
+    assert old == {
+        "root": {
+            "l": [
+                {"name": "a", "p": 3, "q": 1},
+                {"name": "a", "p": 2},
+                {"name": "b", "p": 4},
+                {"name": "b", "p": 5},
+            ]
+        }
+    }
+
+
+def test_merge_lists_by_default_dict_id():
+    old = {"root": {"l": [{"dynaconf_id": 1, "a": "A"}, "x"]}}
+    new = {"root": {"l": ["y", {"dynaconf_id": 1, "b": "B"}, "dynaconf_merge"]}}
+    Merger.merge(old, new)
+    assert old == {"root": {"l": [{"dynaconf_id": 1, "a": "A", "b": "B"}, "x", "y"]}}
+
+
+def test_merge_lists_of_different_lengths():
+    old = {"root": {"l": [1, [2], {"a": 3}]}}
+    new = {"root": {"l": [4]}}
+    Merger.merge(old, new)
+    assert old == {"root": {"l": [4, [2], {"a": 3}]}}
+
+    new = {"root": {"l": [5, None, None, [6], {"b": 7}]}}
+    Merger.merge(old, new)
+    assert old == {"root": {"l": [5, [2], {"a": 3}, [6], {"b": 7}]}}
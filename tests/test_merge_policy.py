@@ -0,0 +1,81 @@
+from dynamerge.merge_policy import MergePolicy, MergePolicyNode, PathPolicyTrie
+import dataclasses
+import pytest
+
+
+def test_merge_policy_is_immutable():
+    merge_policy = MergePolicy()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        merge_policy.merge = True
+
+
+def test_derive_without_changes_reuses_parent():
+    merge_policy = MergePolicy(merge=True)
+    assert merge_policy.derive() is merge_policy
+    assert merge_policy.derive([]) is merge_policy
+
+
+def test_derive_with_marks_is_shared():
+    merge_policy = MergePolicy()
+    derived = merge_policy.derive([("merge", True)])
+    assert derived == MergePolicy(merge=True)
+    assert merge_policy == MergePolicy()
+    assert MergePolicy().derive([("merge", True)]) is derived
+
+
+def test_derive_marks_override_path_policy():
+    path_policy = MergePolicy(merge=True, merge_unique=True)
+    derived = MergePolicy().derive([("merge", False)], path_policy)
+    assert derived == MergePolicy(merge=False, merge_unique=True)
+    assert MergePolicy().derive(path_policy=path_policy) == path_policy
+
+
+def test_load_from_mark_list_invalid_mark():
+    with pytest.raises(TypeError):
+        MergePolicy().load_from_mark_list([("invalid", True)])
+
+
+def test_merge_policy_node_lookup():
+    merge = MergePolicy(merge=True)
+    tree = MergePolicyNode(
+        "root",
+        MergePolicy(),
+        [
+            MergePolicyNode("b", MergePolicy()),
+            MergePolicyNode("a", MergePolicy(), [MergePolicyNode(0, merge)]),
+        ],
+    )
+    assert [node.key for node in tree] == ["b", "a"]
+    assert tree["a"][0].merge_policy is merge
+    assert tree.get_policy(("root", "a", 0)) is merge
+    assert tree.get_node(("root",)) is tree
+    assert tree.get("c") is None
+    with pytest.raises(KeyError):
+        tree.get_policy(("root", "a", 1))
+    with pytest.raises(KeyError):
+        tree.get_policy(("a", 0))
+
+
+def test_path_policy_trie():
+    exact = MergePolicy(merge=True)
+    typed = MergePolicy(merge_unique=True)
+    wildcard = MergePolicy(dict_id_key="name")
+    trie = PathPolicyTrie(
+        {
+            ("root", "a"): exact,
+            ("root", int): typed,
+            ("root", "*"): wildcard,
+            ("root", "*", "databases"): exact,
+        }
+    )
+    assert trie.get(("root", "a")) is exact
+    assert trie.get(("root", 0)) is typed
+    assert trie.get(("root", "b")) is wildcard
+    assert trie.get(("root", "b", "databases")) is exact
+    assert trie.get(("root",)) is None
+    assert trie.get(("other", "a")) is None
+
+    cursor = trie.root_cursor()
+    for key in ("other", "a", "b"):
+        cursor = PathPolicyTrie.descend(cursor, key)
+    assert cursor == PathPolicyTrie.EMPTY_CURSOR
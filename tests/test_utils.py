@@ -31,3 +31,19 @@ def test_parse_from_list_multiple():
     ]
     mark_list = ScopeParser.parse_from_list(sample_list)
     assert len(mark_list) == 4
+
+
+def test_parse_from_list_first_position():
+    sample_list = ["dynaconf_merge", "a"]
+    assert ScopeParser.parse_from_list(sample_list) == [("merge", True)]
+    assert sample_list == ["a"]
+
+
+def test_parse_from_list_keeps_plain_items():
+    sample_list = ["dynaconf", "Dynaconf_Merge", "@foo", "", "d", 1, "@EMPTY", "x"]
+    assert ScopeParser.parse_from_list(sample_list) == [("merge", True)]
+    assert sample_list == ["dynaconf", "@foo", "", "d", 1, None, "x"]
+
+    plain_list = ["host_a", "host_b"]
+    assert ScopeParser.parse_from_list(plain_list) == []
+    assert plain_list == ["host_a", "host_b"]